@@ -1,13 +1,22 @@
 import os
-from flask import Flask, request, jsonify, render_template, url_for, redirect, make_response
+from flask import Flask, request, jsonify, render_template, url_for, redirect, make_response, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from dotenv import load_dotenv
 from config import Config
 from models.spam_model import SpamDetector
+from models.pattern_miner import PatternMiner
+from models.online_trainer import OnlineTrainer
+from models.inference_pool import InferencePool
+from monitoring import metrics, RequestProfiler
 from flask_restx import Api, Resource, fields
-from database.models import db, User, RequestHistory
-from database import init_app as init_db
+from database.models import (
+    db, User, RequestHistory, RequestStatsDaily, RequestStatsHourly,
+    UserRequestStats, UserSignupDaily, Feedback
+)
+from database import init_app as init_db, history_writer
+from database.pagination import keyset_page, CountCache
+from database.export import EXPORT_FORMATS, iter_export_rows, export_chunks, gzip_chunks
 from auth import init_app as init_auth
 from auth.routes import auth_ns
 from auth.utils import check_guest_limit, admin_required
@@ -117,7 +126,10 @@ def api_urls():
         },
         'api': {
             'check_spam': f"{base_url}/api/check-spam",
+            'check_spam_batch': f"{base_url}/api/check-spam/batch",
             'history': f"{base_url}/api/history",
+            'history_stats': f"{base_url}/api/history/stats",
+            'feedback': f"{base_url}/api/feedback",
             'example_spam': f"{base_url}/api/example/spam",
             'example_ham': f"{base_url}/api/example/ham",
         },
@@ -128,6 +140,10 @@ def api_urls():
             'users_list': f"{base_url}/api/admin/users/list",
             'requests': f"{base_url}/api/admin/requests",
             'export_requests': f"{base_url}/api/admin/requests/export",
+            'refresh_patterns': f"{base_url}/api/admin/patterns/refresh",
+            'model': f"{base_url}/api/admin/model",
+            'reload_model': f"{base_url}/api/admin/model/reload",
+            'train_model': f"{base_url}/api/admin/model/train",
         },
         'frontend': {
             'root': f"{base_url}/",
@@ -153,13 +169,100 @@ spam_request = api.model('SpamRequest', {
 
 spam_response = api.model('SpamResponse', {
     'status': fields.String(description='Status of the request'),
+    'is_spam': fields.Boolean(description='Whether the text is spam or not'),
+    'confidence': fields.Float(description='Confidence score (0-1)'),
+    'text': fields.String(description='The text that was checked'),
+    'model_version': fields.String(description='Version of the model that made the prediction')
+})
+
+spam_batch_request = api.model('SpamBatchRequest', {
+    'texts': fields.List(fields.String, required=True, description='Texts to check for spam')
+})
+
+spam_batch_result = api.model('SpamBatchResult', {
     'is_spam': fields.Boolean(description='Whether the text is spam or not'),
     'confidence': fields.Float(description='Confidence score (0-1)'),
     'text': fields.String(description='The text that was checked')
 })
 
-# Initialize spam detector
+spam_batch_response = api.model('SpamBatchResponse', {
+    'status': fields.String(description='Status of the request'),
+    'results': fields.List(fields.Nested(spam_batch_result), description='Results in the same order as the texts'),
+    'model_version': fields.String(description='Version of the model that made the predictions')
+})
+
+feedback_request = api.model('FeedbackRequest', {
+    'request_id': fields.Integer(required=True, description='ID of the history entry being labelled'),
+    'is_spam': fields.Boolean(required=True, description='The correct label: true for spam, false for not spam')
+})
+
+# Cache of filtered request totals for the admin requests page
+admin_count_cache = CountCache(ttl=app.config['ADMIN_COUNT_CACHE_TTL'])
+
+# Initialize spam detector and load the model before serving any request
 spam_detector = SpamDetector()
+spam_detector.init_app(app)
+
+# Optionally score in a pool of processes with micro-batching
+inference_pool = InferencePool()
+inference_pool.init_app(app, spam_detector)
+
+# Initialize the spam pattern miner
+pattern_miner = PatternMiner()
+pattern_miner.init_app(app, spam_detector)
+
+# Initialize online training from user feedback
+online_trainer = OnlineTrainer()
+online_trainer.init_app(app, spam_detector)
+
+# Per-worker metrics at /metrics
+metrics.init_app(app)
+
+def db_pool_connections():
+    """Connections of this worker's database pool by state"""
+    pool = db.engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return None  # e.g. the single-connection pool of an in-memory SQLite database
+    return [
+        (('checked_out',), pool.checkedout()),
+        (('checked_in',), pool.checkedin()),
+        (('overflow',), max(pool.overflow(), 0))
+    ]
+
+metrics.collect('prediction_cache_lookups_total', 'Prediction cache lookups by result',
+                lambda: [(('hit',), spam_detector.cache.hits), (('miss',), spam_detector.cache.misses)],
+                type='counter', labelnames=['result'])
+metrics.collect('prediction_cache_hit_ratio', 'Share of prediction cache lookups that hit',
+                lambda: spam_detector.cache.stats()['hit_rate'])
+metrics.collect('prediction_cache_evictions_total', 'Entries evicted from the prediction cache',
+                lambda: spam_detector.cache.evictions, type='counter')
+metrics.collect('model_info', 'Live model version (value is always 1)',
+                lambda: [((spam_detector.model_version, spam_detector.model_format), 1)] if spam_detector.model_version else None,
+                labelnames=['version', 'format'])
+metrics.collect('db_pool_connections', 'Database pool connections by state',
+                db_pool_connections, labelnames=['state'])
+metrics.collect('history_queue_depth', 'History rows waiting for the write-behind flush',
+                history_writer.queue_depth)
+metrics.collect('history_flushes_total', 'History write-behind flushes by result',
+                lambda: [(('ok',), history_writer.flushes), (('failed',), history_writer.failed_flushes)],
+                type='counter', labelnames=['result'])
+metrics.collect('inference_pool_batches_total', 'Micro-batches sent to the inference pool',
+                lambda: inference_pool.batches, type='counter')
+metrics.collect('inference_pool_texts_total', 'Texts scored by the inference pool',
+                lambda: inference_pool.texts, type='counter')
+
+def request_is_admin():
+    """True if the current request carries a valid admin access token"""
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return False
+    user = db.session.get(User, get_jwt_identity())
+    return bool(user and user.is_admin)
+
+# Sampled request profiling, browsed at /debug/profiles
+request_profiler = RequestProfiler()
+request_profiler.init_app(app, is_admin=request_is_admin)
 
 # Define a decorator for optional JWT authentication
 def jwt_optional(fn):
@@ -198,36 +301,129 @@ class CheckSpam(Resource):
         
         # Get user ID if authenticated
         user_id = None
-        try:
-            verify_jwt_in_request(optional=True)
-            user_id = get_jwt_identity()
-        except Exception:
-            # Check guest limit
-            if not check_guest_limit(request.remote_addr):
+        with metrics.stage('auth'):
+            try:
+                verify_jwt_in_request(optional=True)
+                user_id = get_jwt_identity()
+            except Exception:
+                pass  # Invalid or expired tokens are treated as guests
+        
+        # Check guest limit
+        if not user_id:
+            with metrics.stage('guest_limit'):
+                allowed = check_guest_limit('check_spam')
+            if not allowed:
                 return {
                     "status": "error",
                     "message": "Guest daily limit exceeded. Please login or try again tomorrow."
                 }, 429
         
         # Predict if text is spam
-        is_spam, confidence = spam_detector.predict(text)
+        with metrics.stage('predict'):
+            (is_spam, confidence), model_version = spam_detector.predict(text, return_version=True)
         
-        # Save to history if user is authenticated
+        # Queue for history if user is authenticated
         if user_id:
-            request_history = RequestHistory(
-                user_id=user_id,
-                text=text,
-                is_spam=bool(is_spam),  # Convert NumPy bool_ to Python bool
-                confidence=float(confidence)  # Convert NumPy float to Python float
-            )
-            db.session.add(request_history)
-            db.session.commit()
+            with metrics.stage('history'):
+                history_writer.add([{
+                    'user_id': user_id,
+                    'text': text,
+                    'is_spam': bool(is_spam),  # Convert NumPy bool_ to Python bool
+                    'confidence': float(confidence),  # Convert NumPy float to Python float
+                    'model_version': model_version
+                }])
         
         return {
             "status": "success",
             "is_spam": bool(is_spam),  # Convert NumPy bool_ to Python bool
             "confidence": float(confidence),  # Convert NumPy float to Python float
-            "text": text
+            "text": text,
+            "model_version": model_version
+        }
+
+@ns.route('/check-spam/batch')
+class CheckSpamBatch(Resource):
+    @ns.doc(
+        description="Check many texts for spam in a single request",
+        responses={200: 'Success', 400: 'Invalid input', 429: 'Guest limit exceeded'}
+    )
+    @ns.expect(spam_batch_request)
+    @ns.response(200, 'Success', spam_batch_response)
+    @jwt_optional
+    def post(self):
+        """Check a batch of texts for spam"""
+        # Get request data
+        data = request.get_json() or {}
+        texts = data.get('texts')
+        
+        # Validate input
+        if not isinstance(texts, list) or not texts:
+            return {
+                "status": "error",
+                "message": "Texts must be a non-empty list"
+            }, 400
+        
+        max_texts = app.config['BATCH_MAX_TEXTS']
+        if len(texts) > max_texts:
+            return {
+                "status": "error",
+                "message": f"A batch may contain at most {max_texts} texts"
+            }, 400
+        
+        if not all(isinstance(text, str) and text for text in texts):
+            return {
+                "status": "error",
+                "message": "Texts must be non-empty strings"
+            }, 400
+        
+        # Get user ID if authenticated
+        user_id = None
+        with metrics.stage('auth'):
+            try:
+                verify_jwt_in_request(optional=True)
+                user_id = get_jwt_identity()
+            except Exception:
+                pass  # Invalid or expired tokens are treated as guests
+        
+        # Check guest limit, counting every text in the batch
+        if not user_id:
+            with metrics.stage('guest_limit'):
+                allowed = check_guest_limit('check_spam_batch', cost=len(texts))
+            if not allowed:
+                return {
+                    "status": "error",
+                    "message": "Guest daily limit exceeded. Please login or try again tomorrow."
+                }, 429
+        
+        # Predict all texts with one vectorizer pass
+        with metrics.stage('predict'):
+            predictions, model_version = spam_detector.predict_batch(texts, return_version=True)
+        
+        # Queue for history in a single bulk insert if user is authenticated
+        if user_id:
+            with metrics.stage('history'):
+                history_writer.add([
+                    {
+                        'user_id': user_id,
+                        'text': text,
+                        'is_spam': is_spam,
+                        'confidence': confidence,
+                        'model_version': model_version
+                    }
+                    for text, (is_spam, confidence) in zip(texts, predictions)
+                ])
+        
+        return {
+            "status": "success",
+            "results": [
+                {
+                    "is_spam": is_spam,
+                    "confidence": confidence,
+                    "text": text
+                }
+                for text, (is_spam, confidence) in zip(texts, predictions)
+            ],
+            "model_version": model_version
         }
 
 # User history endpoint
@@ -240,19 +436,140 @@ class UserHistory(Resource):
             500: 'Internal Server Error'
         },
         security=[{'apikey': []}],
-        description="Get the user's spam check history. Requires authentication. For testing, get a demo token at /auth/demo-token"
+        description="Get the user's spam check history, newest first, one page at a time. Pass next_cursor from a response as cursor to get the next page. Requires authentication. For testing, get a demo token at /auth/demo-token"
     )
+    @api.doc(params={
+        'limit': 'Maximum number of items to return (default 50, max 200)',
+        'cursor': 'The next_cursor value from the previous page'
+    })
     @jwt_required()
     def get(self):
         """Get user's spam check history (requires authentication)"""
         user_id = get_jwt_identity()
+        limit = request.args.get('limit', app.config['HISTORY_PAGE_SIZE'], type=int)
+        limit = max(1, min(limit, app.config['HISTORY_MAX_PAGE_SIZE']))
+        
+        # Get one page of user history, newest first
+        try:
+            history, next_cursor = keyset_page(
+                RequestHistory.query.filter_by(user_id=user_id),
+                RequestHistory.timestamp,
+                RequestHistory.id,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError:
+            return {
+                "status": "error",
+                "message": "Invalid cursor"
+            }, 400
+        
+        return {
+            "status": "success",
+            "history": [item.to_dict() for item in history],
+            "next_cursor": next_cursor
+        }
+
+# User history totals endpoint
+@ns.route('/history/stats')
+class UserHistoryStats(Resource):
+    @api.doc(
+        responses={
+            200: 'Success',
+            401: 'Unauthorized',
+            500: 'Internal Server Error'
+        },
+        security=[{'apikey': []}],
+        description="Get the total, spam and ham counts of the user's whole history. Requires authentication. For testing, get a demo token at /auth/demo-token"
+    )
+    @jwt_required()
+    def get(self):
+        """Get user's spam check totals (requires authentication)"""
+        user_id = get_jwt_identity()
         
-        # Get user history
-        history = RequestHistory.query.filter_by(user_id=user_id).order_by(RequestHistory.timestamp.desc()).all()
+        # Read from the per-user rollup instead of counting history rows
+        stats = db.session.get(UserRequestStats, user_id)
         
         return {
             "status": "success",
-            "history": [item.to_dict() for item in history]
+            "total": stats.total if stats else 0,
+            "spam": stats.spam if stats else 0,
+            "ham": stats.ham if stats else 0
+        }
+
+# Feedback endpoint
+@ns.route('/feedback')
+class SpamFeedback(Resource):
+    @api.doc(
+        responses={
+            200: 'Success',
+            400: 'Invalid input',
+            401: 'Unauthorized',
+            404: 'History entry not found',
+            409: 'The model has already learned a different label'
+        },
+        security=[{'apikey': []}],
+        description="Label one of your checked texts as spam or not spam. Admins can label any request. Labels are used to update the model in the background. Sending a new label for the same request replaces the previous one until the model has learned the request; after that, a different label is rejected."
+    )
+    @ns.expect(feedback_request)
+    @jwt_required()
+    def post(self):
+        """Label a checked text as spam or not spam (requires authentication)"""
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        request_id = data.get('request_id')
+        is_spam = data.get('is_spam')
+        
+        if not isinstance(request_id, int) or not isinstance(is_spam, bool):
+            return {
+                "status": "error",
+                "message": "request_id (integer) and is_spam (boolean) are required"
+            }, 400
+        
+        # The token can outlive its user
+        user = db.session.get(User, user_id)
+        if user is None:
+            return {
+                "status": "error",
+                "message": "User not found"
+            }, 401
+        
+        # Users can only label their own requests
+        entry = db.session.get(RequestHistory, request_id)
+        if entry is None or (entry.user_id != user_id and not user.is_admin):
+            return {
+                "status": "error",
+                "message": "History entry not found"
+            }, 404
+        
+        # partial_fit can't unlearn, so a learned label is final
+        learned = online_trainer.learned_label(request_id)
+        if learned is not None and learned != is_spam:
+            return {
+                "status": "error",
+                "message": "The model has already learned a different label for this request"
+            }, 409
+        
+        feedback = Feedback.query.filter_by(request_id=request_id, user_id=user_id).first()
+        if feedback is None:
+            feedback = Feedback(request_id=request_id, user_id=user_id)
+            db.session.add(feedback)
+        feedback.is_spam = is_spam
+        feedback.from_admin = bool(user.is_admin)
+        feedback.created_at = datetime.utcnow()
+        # A label the model already learned must not be applied twice
+        if learned is None:
+            feedback.trained_at = None
+        elif feedback.trained_at is None:
+            feedback.trained_at = feedback.created_at
+        db.session.commit()
+        
+        # Update the model once enough labels are waiting
+        online_trainer.maybe_train()
+        
+        return {
+            "status": "success",
+            "feedback": feedback.to_dict()
         }
 
 # Example endpoints
@@ -336,18 +653,20 @@ def admin_stats():
     return render_template('admin/stats.html')
 
 # Admin API endpoints
-@app.route('/api/admin/requests', methods=['GET'])
-@jwt_required()
-@admin_required()
-def admin_api_requests():
-    """Get requests with pagination and filtering"""
-    # Get query parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    user_id = request.args.get('user_id', type=int)
-    result = request.args.get('result')
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
+def build_admin_requests_query(args):
+    """
+    Build the joined RequestHistory query for the admin request filters
+    
+    Args:
+        args (MultiDict): Request arguments (user_id, result, date_from, date_to)
+        
+    Returns:
+        tuple: (query, filter_key) where filter_key identifies the filters for caching
+    """
+    user_id = args.get('user_id', type=int)
+    result = (args.get('result') or '').lower()
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
     
     # Build query
     query = db.session.query(
@@ -360,29 +679,53 @@ def admin_api_requests():
     if user_id:
         query = query.filter(RequestHistory.user_id == user_id)
     
-    if result:
-        if result.lower() == 'spam':
-            query = query.filter(RequestHistory.is_spam == True)
-        elif result.lower() == 'ham':
-            query = query.filter(RequestHistory.is_spam == False)
+    if result == 'spam':
+        query = query.filter(RequestHistory.is_spam == True)
+    elif result == 'ham':
+        query = query.filter(RequestHistory.is_spam == False)
     
     if date_from:
-        date_from = datetime.strptime(date_from, '%Y-%m-%d')
-        query = query.filter(RequestHistory.timestamp >= date_from)
+        query = query.filter(RequestHistory.timestamp >= datetime.strptime(date_from, '%Y-%m-%d'))
     
     if date_to:
-        date_to = datetime.strptime(date_to, '%Y-%m-%d')
-        date_to = date_to + timedelta(days=1)  # Include the end date
-        query = query.filter(RequestHistory.timestamp < date_to)
+        # Include the end date
+        query = query.filter(RequestHistory.timestamp < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
     
-    # Order by timestamp (newest first)
-    query = query.order_by(RequestHistory.timestamp.desc())
+    return query, (user_id, result, date_from, date_to)
+
+@app.route('/api/admin/requests', methods=['GET'])
+@jwt_required()
+@admin_required()
+def admin_api_requests():
+    """Get requests with cursor pagination and filtering"""
+    # Get query parameters
+    per_page = request.args.get('per_page', 10, type=int)
+    per_page = max(1, min(per_page, app.config['ADMIN_MAX_PAGE_SIZE']))
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
     
-    # Paginate
-    total = query.count()
-    pages = (total + per_page - 1) // per_page
-    offset = (page - 1) * per_page
-    requests_page = query.offset(offset).limit(per_page).all()
+    try:
+        query, filter_key = build_admin_requests_query(request.args)
+        
+        # Seek to the cursor instead of counting and skipping earlier pages
+        requests_page, next_cursor = keyset_page(
+            query,
+            RequestHistory.timestamp,
+            RequestHistory.id,
+            cursor=request.args.get('cursor'),
+            limit=per_page
+        )
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid cursor or date filter'
+        }), 400
+    
+    # The total is only needed for the "of N" label, so serve it from a
+    # short-lived cache instead of counting on every page view
+    total = None
+    total_is_cached = False
+    if include_total:
+        total, total_is_cached = admin_count_cache.get(filter_key, query.count)
     
     # Format requests
     formatted_requests = []
@@ -399,10 +742,10 @@ def admin_api_requests():
     
     return jsonify({
         'requests': formatted_requests,
-        'page': page,
-        'pages': pages,
+        'next_cursor': next_cursor,
         'per_page': per_page,
-        'total': total
+        'total': total,
+        'total_is_cached': total_is_cached
     })
 
 @app.route('/api/admin/stats', methods=['GET'])
@@ -410,17 +753,24 @@ def admin_api_requests():
 @admin_required()
 def admin_api_stats():
     """Get basic statistics for the admin dashboard"""
-    # Get user stats
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    new_users_today = User.query.filter(
-        User.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    ).count()
-    
-    # Get request stats
-    total_requests = RequestHistory.query.count()
-    spam_requests = RequestHistory.query.filter_by(is_spam=True).count()
-    ham_requests = RequestHistory.query.filter_by(is_spam=False).count()
+    now = datetime.utcnow()
+    today = now.date()
+    
+    # Get user stats in one pass over users
+    total_users, active_users = db.session.query(
+        db.func.count(User.id),
+        db.func.coalesce(db.func.sum(db.case((User.is_active == True, 1), else_=0)), 0)
+    ).one()
+    new_users_today = db.session.query(UserSignupDaily.count).filter(
+        UserSignupDaily.date == today
+    ).scalar() or 0
+    
+    # Get request stats from the daily rollup
+    total_requests, spam_requests, ham_requests = db.session.query(
+        db.func.coalesce(db.func.sum(RequestStatsDaily.total), 0),
+        db.func.coalesce(db.func.sum(RequestStatsDaily.spam), 0),
+        db.func.coalesce(db.func.sum(RequestStatsDaily.ham), 0)
+    ).one()
     
     # Calculate spam rate
     spam_rate = 0
@@ -452,20 +802,10 @@ def admin_api_stats():
         })
     
     # Get API usage over time (last 7 days)
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=7)
-    
-    # Query requests by day
-    daily_requests = db.session.query(
-        db.func.date(RequestHistory.timestamp).label('date'),
-        db.func.count().label('count')
-    ).filter(
-        RequestHistory.timestamp >= start_date,
-        RequestHistory.timestamp <= end_date
-    ).group_by(
-        db.func.date(RequestHistory.timestamp)
-    ).order_by(
-        db.func.date(RequestHistory.timestamp)
+    start_date = today - timedelta(days=7)
+    daily_requests = RequestStatsDaily.query.filter(
+        RequestStatsDaily.date >= start_date,
+        RequestStatsDaily.date <= today
     ).all()
     
     # Format API usage data
@@ -475,16 +815,40 @@ def admin_api_stats():
     }
     
     # Create a dictionary of date -> count for easy lookup
-    date_counts = {str(date): count for date, count in daily_requests}
+    date_counts = {row.date: row.total for row in daily_requests}
     
     # Fill in all dates in the range, even if no requests
     current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        api_usage['labels'].append(date_str)
-        api_usage['values'].append(date_counts.get(date_str, 0))
+    while current_date <= today:
+        api_usage['labels'].append(current_date.strftime('%Y-%m-%d'))
+        api_usage['values'].append(date_counts.get(current_date, 0))
         current_date += timedelta(days=1)
     
+    # Get API usage per hour (last 24 hours)
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    start_hour = current_hour - timedelta(hours=23)
+    hour_counts = {
+        row.hour: row.total
+        for row in RequestStatsHourly.query.filter(RequestStatsHourly.hour >= start_hour).all()
+    }
+    hourly_usage = {
+        'labels': [],
+        'values': []
+    }
+    for offset in range(24):
+        hour = start_hour + timedelta(hours=offset)
+        hourly_usage['labels'].append(hour.strftime('%Y-%m-%d %H:00'))
+        hourly_usage['values'].append(hour_counts.get(hour, 0))
+    
+    # Get the most active users
+    top_users = db.session.query(
+        UserRequestStats, User.username
+    ).join(
+        User, UserRequestStats.user_id == User.id
+    ).order_by(
+        UserRequestStats.total.desc()
+    ).limit(5).all()
+    
     return jsonify({
         'user_stats': {
             'total': total_users,
@@ -499,7 +863,17 @@ def admin_api_stats():
         },
         'recent_users': [user.to_dict() for user in recent_users],
         'recent_requests': formatted_recent_requests,
-        'api_usage': api_usage
+        'api_usage': api_usage,
+        'hourly_usage': hourly_usage,
+        'top_users': [
+            {'user_id': stats.user_id, 'username': username, 'total': stats.total, 'spam': stats.spam, 'ham': stats.ham}
+            for stats, username in top_users
+        ],
+        'prediction_cache': spam_detector.cache.stats(),
+        'inference_pool': inference_pool.stats(),
+        'history_writer': history_writer.stats(),
+        'online_training': online_trainer.stats(),
+        'model_version': spam_detector.model_version
     })
 
 @app.route('/api/admin/users', methods=['GET'])
@@ -656,9 +1030,11 @@ def admin_api_users_list():
 @admin_required()
 def admin_api_detailed_stats():
     """Get detailed statistics for the stats page"""
-    # Get spam vs ham distribution
-    spam_count = RequestHistory.query.filter_by(is_spam=True).count()
-    ham_count = RequestHistory.query.filter_by(is_spam=False).count()
+    # Get spam vs ham distribution from the daily rollup
+    spam_count, ham_count = db.session.query(
+        db.func.coalesce(db.func.sum(RequestStatsDaily.spam), 0),
+        db.func.coalesce(db.func.sum(RequestStatsDaily.ham), 0)
+    ).one()
     
     # Get user registration over time (by month)
     # Use strftime which is supported by SQLite
@@ -681,52 +1057,36 @@ def admin_api_detailed_stats():
         user_registration_data['labels'].append(month)
         user_registration_data['values'].append(count)
     
-    # Get confidence distribution (in ranges)
-    confidence_ranges = [
-        {'min': 0.0, 'max': 0.2, 'label': '0-20%', 'count': 0},
-        {'min': 0.2, 'max': 0.4, 'label': '20-40%', 'count': 0},
-        {'min': 0.4, 'max': 0.6, 'label': '40-60%', 'count': 0},
-        {'min': 0.6, 'max': 0.8, 'label': '60-80%', 'count': 0},
-        {'min': 0.8, 'max': 1.0, 'label': '80-100%', 'count': 0}
-    ]
-    
-    # Count requests in each confidence range
-    for range_data in confidence_ranges:
-        range_data['count'] = RequestHistory.query.filter(
-            RequestHistory.confidence >= range_data['min'],
-            RequestHistory.confidence <= range_data['max']
-        ).count()
+    # Get confidence distribution in one grouped pass; each request falls in
+    # exactly one bucket, with 1.0 counted in the last one
+    buckets = min(max(request.args.get('buckets', app.config['CONFIDENCE_BUCKETS'], type=int), 1), 100)
+    scaled = RequestHistory.confidence * buckets
+    if db.engine.dialect.name != 'sqlite':
+        # CAST rounds on PostgreSQL and MySQL; floor first so it truncates
+        # like SQLite's CAST does (SQLite's own floor() is an optional build)
+        scaled = db.func.floor(scaled)
+    bucket = db.case(
+        (RequestHistory.confidence >= 1, buckets - 1),
+        else_=db.cast(scaled, db.Integer)
+    ).label('bucket')
+    bucket_counts = dict(
+        db.session.query(bucket, db.func.count()).group_by(bucket).all()
+    )
     
     # Format confidence distribution data
     confidence_distribution = {
-        'labels': [r['label'] for r in confidence_ranges],
-        'values': [r['count'] for r in confidence_ranges]
+        'labels': [],
+        'values': []
     }
+    for i in range(buckets):
+        confidence_distribution['labels'].append(f"{round(i * 100 / buckets, 1):g}-{round((i + 1) * 100 / buckets, 1):g}%")
+        confidence_distribution['values'].append(bucket_counts.get(i, 0))
     
-    # Get top spam patterns (simplified - in a real app, you'd use NLP)
-    # This is a placeholder implementation
-    spam_requests = RequestHistory.query.filter_by(is_spam=True).limit(100).all()
-    
-    # Extract common words (very simplified)
-    word_counts = {}
-    for request in spam_requests:
-        words = request.text.lower().split()
-        for word in words:
-            if len(word) > 3:  # Skip short words
-                if word not in word_counts:
-                    word_counts[word] = {'count': 0, 'confidence_sum': 0}
-                word_counts[word]['count'] += 1
-                word_counts[word]['confidence_sum'] += request.confidence
-    
-    # Sort by count and get top 10
-    top_patterns = []
-    for word, data in sorted(word_counts.items(), key=lambda x: x[1]['count'], reverse=True)[:10]:
-        avg_confidence = data['confidence_sum'] / data['count'] if data['count'] > 0 else 0
-        top_patterns.append({
-            'pattern': word,
-            'occurrences': data['count'],
-            'avg_confidence': avg_confidence
-        })
+    # Get the precomputed top spam patterns, mining new requests in the
+    # background when the last run is too old
+    if pattern_miner.is_stale():
+        pattern_miner.refresh_async()
+    top_patterns = [pattern.to_dict() for pattern in pattern_miner.top_patterns(10)]
     
     return jsonify({
         'spam_distribution': {
@@ -738,33 +1098,121 @@ def admin_api_detailed_stats():
         'top_patterns': top_patterns
     })
 
+@app.route('/api/admin/model', methods=['GET'])
+@jwt_required()
+@admin_required()
+def admin_api_model():
+    """Get the live model version and the versions in the registry"""
+    registry = spam_detector.get_registry()
+    
+    return jsonify({
+        'model_version': spam_detector.model_version,
+        'current': registry.current(),
+        'format': spam_detector.model_format,
+        'versions': registry.versions()
+    })
+
+@app.route('/api/admin/model/reload', methods=['POST'])
+@jwt_required()
+@admin_required()
+def admin_api_reload_model():
+    """Activate a registry version (optional) and reload the model without a restart"""
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    
+    try:
+        if version:
+            # Every worker switches on its next pointer check
+            spam_detector.activate(version)
+        else:
+            spam_detector.reload()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'model_version': spam_detector.model_version
+    })
+
+@app.route('/api/admin/model/train', methods=['POST'])
+@jwt_required()
+@admin_required()
+def admin_api_train_model():
+    """Apply pending feedback to the model now"""
+    result = online_trainer.train()
+    
+    return jsonify({
+        'status': 'success',
+        'result': result,
+        'online_training': online_trainer.stats()
+    })
+
+@app.route('/api/admin/patterns/refresh', methods=['POST'])
+@jwt_required()
+@admin_required()
+def admin_api_refresh_patterns():
+    """Mine new requests for spam patterns now; ?full=true re-mines everything in the background"""
+    full = request.args.get('full', 'false').lower() == 'true'
+    if full:
+        # Re-mining the whole history can take minutes; don't hold the request
+        if not pattern_miner.refresh_async(full=True):
+            return jsonify({'status': 'error', 'message': 'A pattern mining run is already in progress'}), 409
+        return jsonify({'status': 'accepted', 'message': 'Full pattern mining started'}), 202
+    result = pattern_miner.refresh()
+    
+    return jsonify({
+        'status': 'success',
+        'result': result,
+        'top_patterns': [pattern.to_dict() for pattern in pattern_miner.top_patterns(10)]
+    })
+
 @app.route('/api/admin/requests/export', methods=['GET'])
 @jwt_required()
 @admin_required()
 def admin_api_export_requests():
-    """Export requests as CSV"""
-    # Get all requests
-    requests = db.session.query(
-        RequestHistory, User.username
-    ).join(
-        User, RequestHistory.user_id == User.id
-    ).order_by(
-        RequestHistory.timestamp.desc()
-    ).all()
+    """Export requests as CSV, NDJSON, Parquet or Arrow, streamed, with the /api/admin/requests filters"""
+    fmt = request.args.get('format', 'csv').lower()
+    compress = request.args.get('gzip', 'false').lower() == 'true'
     
-    # Create CSV content
-    csv_content = "ID,User,Text,Is Spam,Confidence,Timestamp\n"
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': f"Unknown format, expected one of: {', '.join(EXPORT_FORMATS)}"
+        }), 400
     
-    for request, username in requests:
-        # Escape text for CSV
-        text = request.text.replace('"', '""')
-        
-        csv_content += f"{request.id},{username},\"{text}\",{request.is_spam},{request.confidence},{request.timestamp}\n"
+    try:
+        query, _ = build_admin_requests_query(request.args)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid date filter'
+        }), 400
+    
+    # Rows are fetched and encoded as the client reads the response
+    rows = iter_export_rows(query, app.config['EXPORT_CHUNK_SIZE'])
+    try:
+        chunks = export_chunks(rows, fmt, app.config['EXPORT_ROW_GROUP_SIZE'])
+    except RuntimeError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 501
+    
+    content_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"requests.{extension}"
+    # Parquet and Arrow are already compressed internally
+    if compress and fmt in ('csv', 'ndjson'):
+        chunks = gzip_chunks(chunks)
+        content_type = 'application/gzip'
+        filename += '.gz'
     
     # Create response
-    response = make_response(csv_content)
-    response.headers['Content-Disposition'] = 'attachment; filename=requests.csv'
-    response.headers['Content-Type'] = 'text/csv'
+    response = app.response_class(stream_with_context(chunks))
+    response.headers['Content-Disposition'] = f"attachment; filename={filename}"
+    response.headers['Content-Type'] = content_type
     
     return response
 
@@ -795,6 +1243,43 @@ def list_endpoints():
         })
     return jsonify(endpoints)
 
+@app.route('/debug/profiles', methods=['GET'])
+@jwt_required()
+@admin_required()
+def list_profiles():
+    """List the slowest profiled requests of this worker"""
+    return jsonify({
+        'sample_rate': request_profiler.sample_rate,
+        'header': request_profiler.header,
+        'keep': request_profiler.keep,
+        'profiled': request_profiler.profiled,
+        'profiles': request_profiler.traces()
+    })
+
+@app.route('/debug/profiles/<int:trace_id>', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_profile(trace_id):
+    """Get one profile; ?format=text returns the pstats report"""
+    trace = request_profiler.get(trace_id)
+    if trace is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Profile not found'
+        }), 404
+    
+    if request.args.get('format') == 'text':
+        return app.response_class(trace['text'], mimetype='text/plain')
+    return jsonify(trace)
+
+@app.route('/debug/profiles', methods=['DELETE'])
+@jwt_required()
+@admin_required()
+def clear_profiles():
+    """Drop all kept profiles"""
+    request_profiler.clear()
+    return jsonify({'status': 'success'})
+
 @app.route('/docs', endpoint='api_docs')
 def api_docs_redirect():
     return redirect('/docs')
@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import asyncio
+import ipaddress
+import contextlib
+import contextvars
+from functools import partial
+from datetime import datetime
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from flask_restx import marshal
+from flask_jwt_extended import decode_token
+from app import app, spam_detector, spam_response
+from auth.utils import guest_limiter
+from database import history_writer
+from database.models import db, RequestHistory
+from database.pagination import keyset_select, split_page
+from database.rollups import record_requests
+from monitoring import metrics
+
+# Async drivers for the sync database URLs the app is configured with
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql'
+}
+
+GUEST_LIMIT_MESSAGE = "Guest daily limit exceeded. Please login or try again tomorrow."
+
+class AuthError(Exception):
+    """Missing or invalid access token"""
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP request the async handlers need"""
+
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.body = body
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.args = {name: values[0] for name, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+
+    def get_json(self):
+        """
+        Parse the body as JSON
+
+        Raises:
+            ValueError: If the body is not valid JSON
+        """
+        return json.loads(self.body or b'null')
+
+    def int_arg(self, name, default):
+        """Integer query parameter, or default if it is missing or malformed"""
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return default
+
+    @property
+    def client_ip(self):
+        """Client IP address, the same way auth.utils.get_client_ip reads it"""
+        ip = self.headers.get('x-forwarded-for') or (self.scope.get('client') or ('127.0.0.1',))[0]
+        try:
+            ipaddress.ip_address(ip)
+            return ip
+        except ValueError:
+            return '127.0.0.1'
+
+class AsyncFront:
+    """
+    ASGI application that serves the hot API routes without blocking
+
+    /api/check-spam (and its batch variant), /api/history and the example
+    endpoints are handled on the event loop: database reads and writes are
+    awaited through an async SQLAlchemy engine, and SpamDetector scoring
+    runs in a thread pool (which hands off to the InferencePool processes
+    when INFERENCE_POOL_SIZE is set), so a waiting request holds a
+    coroutine rather than a worker thread. Every other path, including the
+    admin pages, auth and the frontend, is passed to the Flask app through
+    asgiref's WSGI adapter.
+
+    Run with: uvicorn asgi:application
+    """
+
+    def __init__(self, flask_app, detector):
+        self.app = flask_app
+        self.detector = detector
+        self.engine = None
+        # SQLite takes one writer at a time; queue writes on the loop
+        # instead of letting them fail with 'database is locked'
+        self._write_lock = None
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config.get('ASGI_INFERENCE_THREADS', 8),
+            thread_name_prefix='asgi-inference'
+        )
+        self.wsgi = _wsgi_adapter(flask_app)
+        self.routes = {
+            ('POST', '/api/check-spam'): self.check_spam,
+            ('POST', '/api/check-spam/batch'): self.check_spam_batch,
+            ('GET', '/api/history'): self.history,
+            ('GET', '/api/example/spam'): partial(self.example, True),
+            ('GET', '/api/example/ham'): partial(self.example, False)
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get((scope.get('method'), scope.get('path'))) if scope['type'] == 'http' else None
+        if handler is None:
+            # asgiref records the WSGI thread's executor in context-local
+            # storage that every request on a keep-alive connection shares;
+            # a fresh context keeps a finished call's executor from being
+            # picked up by the next one
+            await asyncio.create_task(self.wsgi(scope, receive, send), context=contextvars.Context())
+            return
+
+        start = time.perf_counter()
+        body = await self.read_body(receive)
+        max_length = self.app.config.get('MAX_CONTENT_LENGTH')
+        if max_length is not None and len(body) > max_length:
+            payload, status = {'message': 'Request Entity Too Large'}, 413
+        else:
+            try:
+                payload, status = await handler(AsyncRequest(scope, body))
+            except Exception:
+                self.app.logger.exception(f"Exception on {scope['path']} [{scope['method']}]")
+                payload, status = {'message': 'Internal Server Error'}, 500
+        await send_json(send, status, payload)
+
+        # Same series the Flask hooks record; these routes have no
+        # parameters, so the path is also their URL rule
+        if metrics.enabled:
+            metrics.observe_request(scope['path'], scope['method'], status, time.perf_counter() - start)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self.get_engine()
+                except RuntimeError as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                # Write queued history rows before the process exits
+                await asyncio.to_thread(history_writer.flush)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def get_engine(self):
+        """The async engine, created from the app's database URL on first use"""
+        if self.engine is None:
+            self.engine = _create_async_engine(self.app)
+            if self.engine.url.get_backend_name() == 'sqlite':
+                self._write_lock = asyncio.Lock()
+        return self.engine
+
+    def identity(self, request):
+        """
+        User ID from the request's access token
+
+        Raises:
+            AuthError: If the token is missing, invalid, expired or a refresh token
+        """
+        header = request.headers.get('authorization')
+        if not header:
+            raise AuthError('Missing Authorization Header')
+        if not header.startswith('Bearer '):
+            raise AuthError("Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'")
+
+        try:
+            with self.app.app_context():
+                claims = decode_token(header[len('Bearer '):])
+        except Exception as e:
+            raise AuthError(str(e))
+        if claims.get('type') != 'access':
+            raise AuthError('Only non-refresh tokens are allowed')
+        return claims[self.app.config.get('JWT_IDENTITY_CLAIM', 'sub')]
+
+    def optional_identity(self, request):
+        """User ID, or None for guests; invalid or expired tokens are treated as guests"""
+        try:
+            return self.identity(request)
+        except AuthError:
+            return None
+
+    async def guest_allowed(self, request, route, cost=1):
+        """Count a guest request against its limit without blocking the loop"""
+        # The SQLite store does file I/O
+        return await asyncio.to_thread(guest_limiter.hit, route, request.client_ip, cost)
+
+    async def predict_batch(self, texts):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self.detector.predict_batch, texts, return_version=True)
+        )
+
+    async def add_history(self, rows):
+        """Queue history rows, or insert them now when write-behind is off"""
+        if history_writer.enabled:
+            history_writer.add(rows)
+            return
+
+        # Stamp rows the way HistoryWriter.add does
+        now = datetime.utcnow()
+        rows = [dict(row, timestamp=row.get('timestamp') or now) for row in rows]
+        engine = self.get_engine()
+        async with self._write_lock or contextlib.nullcontext():
+            async with engine.begin() as connection:
+                await connection.execute(insert(RequestHistory), rows)
+                # Keep the stats rollups in the same transaction
+                await connection.run_sync(record_requests, rows)
+
+    async def check_spam(self, request):
+        try:
+            data = request.get_json() or {}
+        except ValueError:
+            return {'message': 'The browser (or proxy) sent a request that this server could not understand.'}, 400
+        text = data.get('text', '') if isinstance(data, dict) else ''
+
+        if not text:
+            return marshal({'status': 'error', 'message': 'Text cannot be empty'}, spam_response), 400
+
+        user_id = self.optional_identity(request)
+        if not user_id and not await self.guest_allowed(request, 'check_spam'):
+            return marshal({'status': 'error', 'message': GUEST_LIMIT_MESSAGE}, spam_response), 429
+
+        results, model_version = await self.predict_batch([text])
+        is_spam, confidence = results[0]
+
+        if user_id:
+            await self.add_history([{
+                'user_id': user_id,
+                'text': text,
+                'is_spam': is_spam,
+                'confidence': confidence,
+                'model_version': model_version
+            }])
+
+        return marshal({
+            'status': 'success',
+            'is_spam': is_spam,
+            'confidence': confidence,
+            'text': text,
+            'model_version': model_version
+        }, spam_response), 200
+
+    async def check_spam_batch(self, request):
+        try:
+            data = request.get_json() or {}
+        except ValueError:
+            return {'message': 'The browser (or proxy) sent a request that this server could not understand.'}, 400
+        texts = data.get('texts') if isinstance(data, dict) else None
+
+        if not isinstance(texts, list) or not texts:
+            return {'status': 'error', 'message': 'Texts must be a non-empty list'}, 400
+
+        max_texts = self.app.config['BATCH_MAX_TEXTS']
+        if len(texts) > max_texts:
+            return {'status': 'error', 'message': f"A batch may contain at most {max_texts} texts"}, 400
+
+        if not all(isinstance(text, str) and text for text in texts):
+            return {'status': 'error', 'message': 'Texts must be non-empty strings'}, 400
+
+        user_id = self.optional_identity(request)
+        if not user_id and not await self.guest_allowed(request, 'check_spam_batch', cost=len(texts)):
+            return {'status': 'error', 'message': GUEST_LIMIT_MESSAGE}, 429
+
+        predictions, model_version = await self.predict_batch(texts)
+
+        if user_id:
+            await self.add_history([
+                {
+                    'user_id': user_id,
+                    'text': text,
+                    'is_spam': is_spam,
+                    'confidence': confidence,
+                    'model_version': model_version
+                }
+                for text, (is_spam, confidence) in zip(texts, predictions)
+            ])
+
+        return {
+            'status': 'success',
+            'results': [
+                {'is_spam': is_spam, 'confidence': confidence, 'text': text}
+                for text, (is_spam, confidence) in zip(texts, predictions)
+            ],
+            'model_version': model_version
+        }, 200
+
+    async def history(self, request):
+        try:
+            user_id = self.identity(request)
+        except AuthError as e:
+            return {'msg': str(e)}, 401
+
+        limit = request.int_arg('limit', self.app.config['HISTORY_PAGE_SIZE'])
+        limit = max(1, min(limit, self.app.config['HISTORY_MAX_PAGE_SIZE']))
+
+        try:
+            statement = keyset_select(
+                select(RequestHistory).where(RequestHistory.user_id == user_id),
+                RequestHistory.timestamp,
+                RequestHistory.id,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid cursor'}, 400
+
+        async with AsyncSession(self.get_engine()) as session:
+            rows = (await session.scalars(statement)).all()
+        history, next_cursor = split_page(rows, limit)
+
+        return {
+            'status': 'success',
+            'history': [item.to_dict() for item in history],
+            'next_cursor': next_cursor
+        }, 200
+
+    async def example(self, is_spam, request):
+        example = self.detector.get_example(is_spam=is_spam)
+
+        # Add a subject line to make it more email-like
+        subject = "URGENT: Action Required - Account Verification" if is_spam else "Meeting Notes - Project Update"
+        example_with_subject = f"Subject: {subject}\n\n{example}"
+
+        results, _ = await self.predict_batch([example_with_subject])
+        predicted_spam, confidence = results[0]
+
+        return {
+            'text': example_with_subject,
+            'is_spam': predicted_spam,
+            'confidence': confidence
+        }, 200
+
+async def send_json(send, status, payload):
+    """Send a complete JSON response"""
+    body = (json.dumps(payload) + '\n').encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+            # The Flask app allows every origin (flask-cors)
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def _wsgi_adapter(flask_app):
+    """Wrap the Flask app for the routes the async front doesn't serve"""
+    try:
+        from asgiref.wsgi import WsgiToAsgi
+    except ImportError:
+        raise RuntimeError("ASGI mode needs the asgiref package: pip install asgiref")
+    return WsgiToAsgi(flask_app)
+
+def _create_async_engine(flask_app):
+    """
+    Async engine for the app's database
+
+    ASYNC_DATABASE_URI is used if set; otherwise the Flask-SQLAlchemy URL
+    (with relative SQLite paths already resolved) gets its async driver.
+    """
+    url = flask_app.config.get('ASYNC_DATABASE_URI')
+    if url:
+        url = make_url(url)
+    else:
+        with flask_app.app_context():
+            url = db.engine.url
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise RuntimeError(f"No async driver known for {backend}; set ASYNC_DATABASE_URI")
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+
+    try:
+        return create_async_engine(url)
+    except ImportError as e:
+        raise RuntimeError(f"ASGI mode needs an async database driver for {url.drivername} "
+                           f"(e.g. pip install aiosqlite): {e}")
+
+application = AsyncFront(app, spam_detector)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(application, host='0.0.0.0', port=port)
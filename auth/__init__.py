@@ -1,7 +1,9 @@
 from flask_jwt_extended import JWTManager
 from .routes import auth_ns
+from .utils import guest_limiter
 
 jwt = JWTManager()
 
 def init_app(app):
-    jwt.init_app(app) 
\ No newline at end of file
+    jwt.init_app(app)
+    guest_limiter.init_app(app) 
\ No newline at end of file
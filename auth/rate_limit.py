@@ -0,0 +1,290 @@
+import os
+import time
+import atexit
+import sqlite3
+import calendar
+import threading
+from datetime import datetime
+from database.models import db, GuestRequest
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+# Store key prefix of the daily quota every guest route draws from; this
+# is the usage checkpointed to the guest_requests table
+QUOTA_KEY = 'quota'
+
+def parse_limit(limit):
+    """
+    Parse a limit such as '10/day' or '100/60' into (count, window_seconds)
+    """
+    count, _, period = limit.partition('/')
+    period = period.strip() or 'day'
+    window = PERIODS[period] if period in PERIODS else float(period)
+    return int(count), window
+
+def sliding_window(state, limit, window, now, cost=1):
+    """
+    Sliding window counter
+
+    Requests are counted in fixed windows aligned to the epoch; the count
+    of the previous window is weighted by how much of it still overlaps
+    the sliding window ending now.
+
+    Args:
+        state (tuple): (window_start, count, previous_count), or None
+        limit (int): Allowed requests per window
+        window (float): Window length in seconds
+        now (float): Current Unix time
+        cost (int): Requests this call accounts for
+
+    Returns:
+        tuple: (allowed, new_state)
+    """
+    window_start = now - now % window
+    if state is None:
+        count, previous = 0, 0
+    else:
+        start, count, previous = state
+        if start != window_start:
+            # The previous window only counts if it is the one right before
+            previous = count if start == window_start - window else 0
+            count = 0
+
+    weight = 1 - (now - window_start) / window
+    if previous * weight + count + cost > limit:
+        return False, (window_start, count, previous)
+    return True, (window_start, count + cost, previous)
+
+class MemoryStore:
+    """Rate limit state held in this worker's memory"""
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now, cost=1):
+        with self._lock:
+            allowed, self._state[key] = sliding_window(self._state.get(key), limit, window, now, cost)
+        return allowed, self._state[key]
+
+    def load(self, key, state):
+        with self._lock:
+            self._state.setdefault(key, state)
+
+    def prune(self, older_than):
+        """Forget keys that have had no requests since older_than"""
+        with self._lock:
+            for key in [key for key, state in self._state.items() if state[0] < older_than]:
+                del self._state[key]
+
+class SQLiteStore:
+    """
+    Rate limit state kept in a SQLite file so all workers on a host share it
+
+    Each hit is one short IMMEDIATE transaction on a local WAL database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        connection = sqlite3.connect(path, timeout=5)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    window_start REAL NOT NULL,
+                    count INTEGER NOT NULL,
+                    previous INTEGER NOT NULL
+                )
+            ''')
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connection(self):
+        """One connection per thread and process"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def hit(self, key, limit, window, now, cost=1):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            state = connection.execute(
+                'SELECT window_start, count, previous FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            allowed, state = sliding_window(state, limit, window, now, cost)
+            connection.execute(
+                'INSERT OR REPLACE INTO rate_limits (key, window_start, count, previous) VALUES (?, ?, ?, ?)',
+                (key,) + state
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, state
+
+    def load(self, key, state):
+        self._connection().execute(
+            'INSERT OR IGNORE INTO rate_limits (key, window_start, count, previous) VALUES (?, ?, ?, ?)',
+            (key,) + tuple(state)
+        )
+
+    def prune(self, older_than):
+        self._connection().execute('DELETE FROM rate_limits WHERE window_start < ?', (older_than,))
+
+class RateLimiter:
+    """
+    Per-client rate limiter for guest requests
+
+    Every guest route draws from one daily quota per client
+    (GUEST_REQUESTS_LIMIT), with a batch costing one request per text, so
+    switching routes doesn't buy a second allowance. GUEST_RATE_LIMITS can
+    add per-route limits on top, e.g. to cap bursts. State lives in memory
+    (or a shared SQLite file with RATE_LIMIT_STORAGE='sqlite'), so the
+    guest path needs no database transaction. Quota usage is checkpointed
+    to the guest_requests table every RATE_LIMIT_CHECKPOINT_INTERVAL
+    seconds from a background thread and reloaded at startup, so a restart
+    does not hand out fresh quotas.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.store = MemoryStore()
+        self.quota = (10, PERIODS['day'])
+        self.limits = {}
+        self.checkpoint_interval = 60
+        self._dirty = {}
+        self._dirty_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['rate_limiter'] = self
+
+        self.quota = parse_limit(f"{app.config['GUEST_REQUESTS_LIMIT']}/day")
+        limits = app.config.get('GUEST_RATE_LIMITS') or {}
+        self.limits = {route: parse_limit(limit) for route, limit in limits.items()}
+        self.checkpoint_interval = app.config.get('RATE_LIMIT_CHECKPOINT_INTERVAL', 60)
+
+        if app.config.get('RATE_LIMIT_STORAGE', 'memory') == 'sqlite':
+            path = app.config.get('RATE_LIMIT_STORAGE_PATH')
+            if not path:
+                os.makedirs(app.instance_path, exist_ok=True)
+                path = os.path.join(app.instance_path, 'rate_limits.db')
+            self.store = SQLiteStore(path)
+
+        with app.app_context():
+            self.restore()
+        atexit.register(self.flush)
+
+    def hit(self, route, client, cost=1):
+        """
+        Record a request and report whether it is within the limits
+
+        Args:
+            route (str): Route name, selects any extra limit from GUEST_RATE_LIMITS
+            client (str): Client identifier, usually the IP address
+            cost (int): Number of requests to account for
+
+        Returns:
+            bool: True if the request is allowed
+        """
+        now = time.time()
+        if route in self.limits:
+            limit, window = self.limits[route]
+            allowed, _ = self.store.hit(f"{route}|{client}", limit, window, now, cost)
+            if not allowed:
+                return False
+
+        limit, window = self.quota
+        allowed, state = self.store.hit(f"{QUOTA_KEY}|{client}", limit, window, now, cost)
+        if allowed and self.checkpoint_interval:
+            self._ensure_thread()
+            with self._dirty_lock:
+                self._dirty[client] = state
+        return allowed
+
+    def _ensure_thread(self):
+        """Start the checkpoint thread in this process (again, after a fork)"""
+        if self._pid == os.getpid():
+            return
+
+        with self._dirty_lock:
+            if self._pid == os.getpid():
+                return
+            # Usage inherited from the parent process is the parent's to write
+            self._dirty = {}
+            self._thread = threading.Thread(target=self._run, name='rate-limit-checkpoint', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            self.flush()
+
+    def flush(self):
+        """Checkpoint now, from any thread"""
+        if self.app is None:
+            return
+        with self.app.app_context():
+            self.checkpoint()
+
+    def restore(self):
+        """Seed the store from guest_requests rows that are still relevant"""
+        _, window = self.quota
+        now = time.time()
+        window_start = now - now % window
+
+        rows = GuestRequest.query.filter(
+            GuestRequest.last_reset >= datetime.utcfromtimestamp(window_start - window)
+        ).all()
+        for row in rows:
+            # last_reset is the naive UTC start of the checkpointed window
+            start = calendar.timegm(row.last_reset.utctimetuple())
+            start -= start % window
+            self.store.load(f"{QUOTA_KEY}|{row.ip_address}", (start, row.request_count, 0))
+
+    def checkpoint(self):
+        """Write quota usage changed since the last checkpoint to guest_requests"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+
+        try:
+            existing = {
+                row.ip_address: row
+                for row in GuestRequest.query.filter(GuestRequest.ip_address.in_(list(dirty))).all()
+            }
+            for ip, (window_start, count, _) in dirty.items():
+                row = existing.get(ip)
+                if row is None:
+                    row = GuestRequest(ip_address=ip)
+                    db.session.add(row)
+                row.request_count = count
+                row.last_reset = datetime.utcfromtimestamp(window_start)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to checkpoint guest rate limits: {e}")
+            with self._dirty_lock:
+                for ip, state in dirty.items():
+                    self._dirty.setdefault(ip, state)
+            return
+
+        # Forget clients idle for more than two windows
+        self.store.prune(time.time() - 2 * max(w for _, w in [self.quota] + list(self.limits.values())))
@@ -1,11 +1,13 @@
-from flask import request, current_app
+from flask import request
 from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity
-from datetime import datetime, timedelta
-from database.models import User, GuestRequest, db
+from database.models import User
+from .rate_limit import RateLimiter
 import ipaddress
 from functools import wraps
 from flask import jsonify
 
+guest_limiter = RateLimiter()
+
 def get_client_ip():
     """Get the client's IP address from the request"""
     if request.headers.getlist("X-Forwarded-For"):
@@ -21,34 +23,18 @@ def get_client_ip():
     except ValueError:
         return '127.0.0.1'  # Default to localhost if invalid
 
-def check_guest_limit():
-    """Check if a guest user has exceeded their request limit"""
-    ip = get_client_ip()
-    guest = GuestRequest.query.filter_by(ip_address=ip).first()
-    
-    if not guest:
-        # Create new guest record
-        guest = GuestRequest(ip_address=ip, request_count=1)
-        db.session.add(guest)
-        db.session.commit()
-        return True
-    
-    # Check if we need to reset the counter (daily)
-    now = datetime.utcnow()
-    if (now - guest.last_reset) > timedelta(days=1):
-        guest.request_count = 1
-        guest.last_reset = now
-        db.session.commit()
-        return True
-    
-    # Check if limit exceeded
-    if guest.request_count >= current_app.config['GUEST_REQUESTS_LIMIT']:
-        return False
+def check_guest_limit(route='check_spam', cost=1):
+    """
+    Check if a guest user has exceeded their request limit
     
-    # Increment counter
-    guest.request_count += 1
-    db.session.commit()
-    return True
+    Args:
+        route (str): Route name, selects any extra limit from GUEST_RATE_LIMITS
+        cost (int): Number of requests to count, e.g. texts in a batch
+        
+    Returns:
+        bool: True if the request is allowed
+    """
+    return guest_limiter.hit(route, get_client_ip(), cost)
 
 def generate_tokens(user_id):
     """Generate access and refresh tokens for a user"""
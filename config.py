@@ -11,4 +11,52 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
-    GUEST_REQUESTS_LIMIT = 10  # Number of requests allowed for guest users per day 
\ No newline at end of file
+    GUEST_REQUESTS_LIMIT = 10  # Number of requests allowed for guest users per day
+    GUEST_RATE_LIMITS = {}  # Extra per-route guest limits on top of the daily quota, as 'count/period' (second, minute, hour, day or seconds)
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')  # 'memory' (per worker) or 'sqlite' (shared on one host)
+    RATE_LIMIT_STORAGE_PATH = os.environ.get('RATE_LIMIT_STORAGE_PATH')  # SQLite rate limit file, defaults to the instance folder
+    RATE_LIMIT_CHECKPOINT_INTERVAL = int(os.environ.get('RATE_LIMIT_CHECKPOINT_INTERVAL', 60))  # Seconds between writes of guest usage to guest_requests
+    BATCH_MAX_TEXTS = int(os.environ.get('BATCH_MAX_TEXTS', 100))  # Maximum number of texts per batch check request
+    MODEL_EAGER_LOAD = os.environ.get('MODEL_EAGER_LOAD', 'true').lower() == 'true'  # Load the model at startup instead of on the first request
+    MODEL_WARMUP_ROUNDS = int(os.environ.get('MODEL_WARMUP_ROUNDS', 3))  # Warm-up passes over the example messages after loading
+    MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'pickle')  # 'pickle', 'compact' (memory-mapped, no unpickling) or 'engine' (compiled, fastest per message)
+    MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 5))  # Seconds between checks for a newly activated model version
+    MODEL_REGISTRY_PATH = os.environ.get('MODEL_REGISTRY_PATH')  # Directory of versioned model artifacts, defaults to models/registry
+    MODEL_REGISTRY_KEEP = int(os.environ.get('MODEL_REGISTRY_KEEP', 5))  # Model versions kept in the registry, 0 keeps all
+    INFERENCE_POOL_SIZE = int(os.environ.get('INFERENCE_POOL_SIZE', 0))  # Processes that score predictions on other cores, 0 scores in the request thread
+    INFERENCE_MAX_BATCH_LATENCY_MS = float(os.environ.get('INFERENCE_MAX_BATCH_LATENCY_MS', 2))  # Milliseconds a request waits for others to share its pool batch
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 64))  # Texts that close a pool batch before the latency window ends
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 10))  # Seconds to wait for the pool before scoring in-process
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')  # Async driver URL for ASGI mode, defaults to DATABASE_URI with its async driver
+    ASGI_INFERENCE_THREADS = int(os.environ.get('ASGI_INFERENCE_THREADS', 8))  # Threads that run model scoring for the ASGI front
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'  # Time requests and hot-path stages and serve them in Prometheus format
+    METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')  # URL of the metrics endpoint
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))  # Share of requests profiled with cProfile, 0 profiles only on request
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')  # Header with which an admin forces a profile of their request
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 20))  # Slowest profiles kept per worker
+    PROFILE_TOP_FUNCTIONS = int(os.environ.get('PROFILE_TOP_FUNCTIONS', 30))  # Functions listed per profile, by cumulative time
+    PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'memory')  # 'memory' (per worker), 'sqlite' (shared on one host) or 'redis'
+    PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH')  # SQLite cache file, defaults to the instance folder
+    PREDICTION_CACHE_URL = os.environ.get('PREDICTION_CACHE_URL', 'redis://localhost:6379/0')  # Redis server for the redis backend
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))  # Maximum cached predictions, 0 disables the memory cache
+    PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 3600))  # Seconds a cached prediction stays valid
+    HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', 'true').lower() == 'true'  # Queue history rows and insert them in batches from a background thread
+    HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 500))  # Flush once this many history rows are queued
+    HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0))  # Seconds between flushes of the history queue
+    HISTORY_PAGE_SIZE = 50  # Default number of history items per page
+    HISTORY_MAX_PAGE_SIZE = 200  # Maximum number of history items per page
+    ADMIN_MAX_PAGE_SIZE = 100  # Maximum number of requests per admin page
+    ADMIN_COUNT_CACHE_TTL = int(os.environ.get('ADMIN_COUNT_CACHE_TTL', 60))  # Seconds a filtered request total is reused
+    CONFIDENCE_BUCKETS = int(os.environ.get('CONFIDENCE_BUCKETS', 5))  # Default bucket count of the confidence histogram
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))  # Rows fetched per round trip when streaming an export
+    EXPORT_ROW_GROUP_SIZE = int(os.environ.get('EXPORT_ROW_GROUP_SIZE', 50000))  # Rows per Parquet row group / Arrow record batch
+    ONLINE_TRAINING = os.environ.get('ONLINE_TRAINING', 'true').lower() == 'true'  # Update the model from feedback in the background
+    ONLINE_TRAINING_MIN_FEEDBACK = int(os.environ.get('ONLINE_TRAINING_MIN_FEEDBACK', 20))  # Pending labels that trigger a background update
+    ONLINE_TRAINING_MAX_FEEDBACK = int(os.environ.get('ONLINE_TRAINING_MAX_FEEDBACK', 10000))  # Most labels applied in one update
+    FEEDBACK_SAMPLE_WEIGHT = float(os.environ.get('FEEDBACK_SAMPLE_WEIGHT', 1.0))  # Weight of a feedback label relative to a training example
+    FEEDBACK_TRUSTED_ONLY = os.environ.get('FEEDBACK_TRUSTED_ONLY', 'true').lower() == 'true'  # Only learn from labels given by admins; anyone can get a demo token
+    PATTERN_MAX_NGRAM = int(os.environ.get('PATTERN_MAX_NGRAM', 2))  # Longest n-gram counted by the spam pattern miner
+    PATTERN_TOP_K = int(os.environ.get('PATTERN_TOP_K', 50))  # Number of ranked spam patterns kept
+    PATTERN_MIN_SUPPORT = int(os.environ.get('PATTERN_MIN_SUPPORT', 5))  # Spam requests a pattern must appear in to be ranked
+    PATTERN_CHUNK_SIZE = int(os.environ.get('PATTERN_CHUNK_SIZE', 5000))  # Requests mined and committed per transaction
+    PATTERN_REFRESH_INTERVAL = int(os.environ.get('PATTERN_REFRESH_INTERVAL', 900))  # Seconds before the stats page triggers a background mining run, 0 disables
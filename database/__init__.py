@@ -1,10 +1,60 @@
-from .models import db, User, RequestHistory, GuestRequest
+from .models import db, User, RequestHistory, GuestRequest, RequestStatsDaily, UserSignupDaily
+from .history_writer import HistoryWriter
+from .rollups import rebuild_rollups
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+history_writer = HistoryWriter()
+
+# Columns added after their table shipped; create_all only creates missing
+# tables (with their indexes), so existing databases get these and any new
+# indexes at startup
+ADDED_COLUMNS = [
+    ('request_history', 'model_version', 'VARCHAR(64)')
+]
+
+def add_missing_columns():
+    """Add any ADDED_COLUMNS an existing database doesn't have yet"""
+    for table, column, ddl_type in ADDED_COLUMNS:
+        existing = {info['name'] for info in inspect(db.engine).get_columns(table)}
+        if column in existing:
+            continue
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+            print(f"Added column {table}.{column}")
+        except (OperationalError, ProgrammingError):
+            # Another worker may have added it first
+            if column not in {info['name'] for info in inspect(db.engine).get_columns(table)}:
+                raise
+
+def add_missing_indexes():
+    """Create any model index an existing table doesn't have yet"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(db.engine, checkfirst=True)
+            except (OperationalError, ProgrammingError):
+                # Another worker may have created it first
+                existing = {info['name'] for info in inspect(db.engine).get_indexes(table.name)}
+                if index.name not in existing:
+                    raise
 
 def init_app(app):
     db.init_app(app)
+    history_writer.init_app(app)
     
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
+        
+        # Fill the rollup tables once for databases that predate them
+        if (RequestHistory.query.first() and not RequestStatsDaily.query.first()) or \
+                (User.query.first() and not UserSignupDaily.query.first()):
+            with db.engine.begin() as connection:
+                rebuild_rollups(connection)
+            print("Stats rollups rebuilt")
         
         # Create demo user if it doesn't exist
         if not User.query.filter_by(username='demo').first():
@@ -0,0 +1,260 @@
+import io
+import os
+import csv
+import json
+import zlib
+import tempfile
+from itertools import islice
+from .models import User, RequestHistory
+
+# Columns of an exported request, in output order
+EXPORT_COLUMNS = (
+    RequestHistory.id,
+    User.username,
+    RequestHistory.text,
+    RequestHistory.is_spam,
+    RequestHistory.confidence,
+    RequestHistory.timestamp
+)
+CSV_HEADER = ('ID', 'User', 'Text', 'Is Spam', 'Confidence', 'Timestamp')
+# Field names used by the NDJSON and columnar formats
+EXPORT_FIELDS = ('id', 'username', 'text', 'is_spam', 'confidence', 'timestamp')
+
+# Formats served by the export endpoint: (media type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+def iter_export_rows(query, chunk_size=5000, newest_first=True):
+    """
+    Stream the rows of an admin requests query as plain tuples
+
+    Only the exported columns are selected, and rows are fetched
+    chunk_size at a time (a server-side cursor where the driver has one),
+    so memory stays flat however many rows match.
+
+    Args:
+        query (Query): Query from build_admin_requests_query
+        chunk_size (int): Rows fetched per round trip
+        newest_first (bool): Order by descending rather than ascending time
+
+    Yields:
+        tuple: (id, username, text, is_spam, confidence, timestamp)
+    """
+    if newest_first:
+        order = (RequestHistory.timestamp.desc(), RequestHistory.id.desc())
+    else:
+        order = (RequestHistory.timestamp, RequestHistory.id)
+    query = query.with_entities(*EXPORT_COLUMNS).order_by(*order).execution_options(yield_per=chunk_size)
+    for row in query:
+        yield tuple(row)
+
+def csv_chunks(rows, rows_per_chunk=1000):
+    """
+    Encode rows as CSV, yielding the text in chunks
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        rows_per_chunk (int): Rows written before a chunk is yielded
+
+    Yields:
+        str: CSV text, starting with the header line
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks, level=6):
+    """
+    Gzip a stream of text chunks on the fly
+
+    Args:
+        chunks (iterable): str or bytes chunks
+        level (int): zlib compression level
+
+    Yields:
+        bytes: A single gzip member, in pieces
+    """
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def ndjson_chunks(rows, rows_per_chunk=1000):
+    """
+    Encode rows as newline-delimited JSON objects, yielding text in chunks
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        rows_per_chunk (int): Rows encoded per yielded chunk
+
+    Yields:
+        str: One JSON object per line
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, rows_per_chunk))
+        if not batch:
+            return
+        lines = []
+        for row in batch:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['timestamp'] = record['timestamp'].isoformat()
+            lines.append(json.dumps(record))
+        yield '\n'.join(lines) + '\n'
+
+def _pyarrow():
+    """Import pyarrow, which only the columnar formats need"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow exports need the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+def arrow_schema():
+    """Arrow schema of an exported request"""
+    pa = _pyarrow()
+    return pa.schema([
+        ('id', pa.int64()),
+        ('username', pa.string()),
+        ('text', pa.string()),
+        ('is_spam', pa.bool_()),
+        ('confidence', pa.float64()),
+        ('timestamp', pa.timestamp('us'))
+    ])
+
+def record_batches(rows, batch_size=50000):
+    """
+    Group rows into Arrow record batches of at most batch_size rows
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        batch_size (int): Rows per batch (a Parquet row group)
+
+    Yields:
+        RecordBatch: Columnar batch with the arrow_schema() layout
+    """
+    pa = _pyarrow()
+    schema = arrow_schema()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        columns = list(zip(*batch))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        )
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what was written until it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+def _open_writer(fmt, sink):
+    pa = _pyarrow()
+    if fmt == 'parquet':
+        return pa.parquet.ParquetWriter(sink, arrow_schema(), compression='zstd')
+    return pa.ipc.new_stream(sink, arrow_schema())
+
+def columnar_chunks(rows, fmt='parquet', batch_size=50000):
+    """
+    Encode rows as Parquet or an Arrow IPC stream, yielding bytes as each
+    row group is finished
+
+    Only one row group is held in memory at a time.
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        fmt (str): 'parquet' or 'arrow'
+        batch_size (int): Rows per row group / record batch
+
+    Yields:
+        bytes: The encoded file, in pieces
+    """
+    sink = _ChunkSink()
+    writer = _open_writer(fmt, sink)
+    for batch in record_batches(rows, batch_size):
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+def export_chunks(rows, fmt='csv', batch_size=50000):
+    """Encode rows in one of EXPORT_FORMATS, yielding str or bytes chunks"""
+    if fmt == 'csv':
+        return csv_chunks(rows)
+    if fmt == 'ndjson':
+        return ndjson_chunks(rows)
+    if fmt in ('parquet', 'arrow'):
+        _pyarrow()
+        return columnar_chunks(rows, fmt, batch_size)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def write_export(rows, path, fmt='parquet', batch_size=50000):
+    """
+    Write rows to a file, replacing it atomically
+
+    Args:
+        rows (iterable): Tuples in EXPORT_COLUMNS order
+        path (str): Destination file
+        fmt (str): One of EXPORT_FORMATS
+        batch_size (int): Rows per row group for the columnar formats
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in export_chunks(rows, fmt, batch_size):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                f.write(chunk)
+                written += len(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return written
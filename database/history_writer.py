@@ -0,0 +1,142 @@
+import os
+import time
+import atexit
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from .models import db, RequestHistory
+from .rollups import record_requests
+
+class HistoryWriter:
+    """
+    Write-behind queue for RequestHistory rows
+
+    Rows are buffered in memory and inserted with one executemany per
+    flush, from a background thread, whenever HISTORY_FLUSH_SIZE rows are
+    waiting or HISTORY_FLUSH_INTERVAL seconds have passed. The queue is
+    flushed on interpreter shutdown. With HISTORY_WRITE_BEHIND disabled,
+    add() inserts and commits synchronously instead.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.flush_size = 500
+        self.flush_interval = 1.0
+        self._rows = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Metrics
+        self.rows_written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('HISTORY_WRITE_BEHIND', True)
+        self.flush_size = app.config.get('HISTORY_FLUSH_SIZE', 500)
+        self.flush_interval = app.config.get('HISTORY_FLUSH_INTERVAL', 1.0)
+        app.extensions['history_writer'] = self
+        atexit.register(self.flush)
+
+    def add(self, rows):
+        """
+        Queue RequestHistory rows for insertion
+
+        Args:
+            rows (list): Dicts of RequestHistory column values
+        """
+        # Stamp rows now; the insert may happen a while later
+        now = datetime.utcnow()
+        rows = [dict(row, timestamp=row.get('timestamp') or now) for row in rows]
+
+        if not self.enabled:
+            self._write(rows)
+            return
+
+        self._ensure_thread()
+        with self._condition:
+            self._rows.extend(rows)
+            if len(self._rows) >= self.flush_size:
+                self._condition.notify()
+
+    def _ensure_thread(self):
+        """Start the flush thread in this process (again, after a fork)"""
+        if self._pid == os.getpid():
+            return
+
+        with self._condition:
+            if self._pid == os.getpid():
+                return
+            # Rows inherited from the parent process belong to the parent
+            self._rows = []
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if len(self._rows) < self.flush_size:
+                    self._condition.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write every queued row now"""
+        with self._flush_lock:
+            with self._condition:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return
+
+            start = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    self._write(rows)
+            except Exception as e:
+                self.failed_flushes += 1
+                print(f"Failed to write {len(rows)} history rows: {e}")
+                # Put them back so the next flush retries
+                with self._condition:
+                    self._rows[:0] = rows
+                return
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.rows_written += len(rows)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+
+    def _write(self, rows):
+        try:
+            db.session.execute(insert(RequestHistory), rows)
+            # Keep the stats rollups in the same transaction
+            record_requests(db.session, rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def queue_depth(self):
+        with self._condition:
+            return len(self._rows)
+
+    def stats(self):
+        """Queue depth and flush latency for the admin stats"""
+        return {
+            'enabled': self.enabled,
+            'queue_depth': self.queue_depth(),
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_flush_ms': round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0
+        }
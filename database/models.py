@@ -43,6 +43,7 @@ class RequestHistory(db.Model):
     is_spam = db.Column(db.Boolean, nullable=False)
     confidence = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    model_version = db.Column(db.String(64))  # Registry version that made the prediction
     
     def to_dict(self):
         return {
@@ -51,14 +52,20 @@ class RequestHistory(db.Model):
             'text': self.text,
             'is_spam': self.is_spam,
             'confidence': self.confidence,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp.isoformat(),
+            'model_version': self.model_version
         }
 
+# Indexes for the history, admin request browsing and stats queries
+db.Index('ix_request_history_user_id_timestamp', RequestHistory.user_id, RequestHistory.timestamp.desc())
+db.Index('ix_request_history_is_spam_timestamp', RequestHistory.is_spam, RequestHistory.timestamp)
+db.Index('ix_request_history_timestamp', RequestHistory.timestamp)
+
 class GuestRequest(db.Model):
     __tablename__ = 'guest_requests'
     
     id = db.Column(db.Integer, primary_key=True)
-    ip_address = db.Column(db.String(45), nullable=False)
+    ip_address = db.Column(db.String(45), nullable=False, index=True)
     request_count = db.Column(db.Integer, default=0)
     last_reset = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -68,4 +75,101 @@ class GuestRequest(db.Model):
             'ip_address': self.ip_address,
             'request_count': self.request_count,
             'last_reset': self.last_reset.isoformat()
-        } 
\ No newline at end of file
+        }
+
+class RequestStatsDaily(db.Model):
+    """Request counts per UTC day, maintained as history rows are written"""
+    __tablename__ = 'request_stats_daily'
+    
+    date = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    spam = db.Column(db.Integer, nullable=False, default=0)
+    ham = db.Column(db.Integer, nullable=False, default=0)
+
+class RequestStatsHourly(db.Model):
+    """Request counts per UTC hour, maintained as history rows are written"""
+    __tablename__ = 'request_stats_hourly'
+    
+    hour = db.Column(db.DateTime, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    spam = db.Column(db.Integer, nullable=False, default=0)
+    ham = db.Column(db.Integer, nullable=False, default=0)
+
+class UserRequestStats(db.Model):
+    """Request counts per user, maintained as history rows are written"""
+    __tablename__ = 'user_request_stats'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    spam = db.Column(db.Integer, nullable=False, default=0)
+    ham = db.Column(db.Integer, nullable=False, default=0)
+
+class UserSignupDaily(db.Model):
+    """New users per UTC day, maintained as users are created"""
+    __tablename__ = 'user_signups_daily'
+    
+    date = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class PatternCount(db.Model):
+    """Number of spam and ham requests containing each n-gram"""
+    __tablename__ = 'pattern_counts'
+    
+    pattern = db.Column(db.String(255), primary_key=True)
+    spam_docs = db.Column(db.Integer, nullable=False, default=0)
+    ham_docs = db.Column(db.Integer, nullable=False, default=0)
+    spam_confidence = db.Column(db.Float, nullable=False, default=0.0)  # Sum over the spam requests
+
+class PatternMinerState(db.Model):
+    """How far the pattern miner has read request_history (a single row)"""
+    __tablename__ = 'pattern_miner_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    spam_total = db.Column(db.Integer, nullable=False, default=0)
+    ham_total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+class SpamPattern(db.Model):
+    """Top spam patterns ranked by lift, rewritten on every mining run"""
+    __tablename__ = 'spam_patterns'
+    
+    rank = db.Column(db.Integer, primary_key=True)
+    pattern = db.Column(db.String(255), nullable=False)
+    spam_docs = db.Column(db.Integer, nullable=False)
+    ham_docs = db.Column(db.Integer, nullable=False)
+    lift = db.Column(db.Float, nullable=False)
+    avg_confidence = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'pattern': self.pattern,
+            'occurrences': self.spam_docs,
+            'ham_occurrences': self.ham_docs,
+            'lift': round(self.lift, 3),
+            'avg_confidence': self.avg_confidence
+        }
+
+class Feedback(db.Model):
+    """A user's or admin's spam/ham label for a checked request"""
+    __tablename__ = 'feedback'
+    __table_args__ = (db.UniqueConstraint('request_id', 'user_id', name='uq_feedback_request_user'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, db.ForeignKey('request_history.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    is_spam = db.Column(db.Boolean, nullable=False)
+    from_admin = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    trained_at = db.Column(db.DateTime, index=True)  # NULL until the model has learned from it
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'request_id': self.request_id,
+            'user_id': self.user_id,
+            'is_spam': self.is_spam,
+            'from_admin': self.from_admin,
+            'created_at': self.created_at.isoformat(),
+            'trained_at': self.trained_at.isoformat() if self.trained_at else None
+        }
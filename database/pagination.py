@@ -0,0 +1,118 @@
+import time
+import base64
+import threading
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor pointing just after the row with this (timestamp, id)"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        timestamp, row_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=50):
+    """
+    Fetch one page of query, newest first, using keyset pagination on (timestamp, id)
+    
+    Rows are located by seeking the index to the cursor instead of skipping
+    over earlier pages, so every page costs the same no matter how deep it is.
+    
+    Args:
+        query (Query): Query with any filters applied, not yet ordered
+        timestamp_column: Column holding the row timestamp
+        id_column: Primary key column used to break timestamp ties
+        cursor (str): Cursor from a previous page, or None for the first page
+        limit (int): Maximum rows to return
+        
+    Returns:
+        tuple: (rows, next_cursor), next_cursor is None on the last page
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    rows = keyset_select(query, timestamp_column, id_column, cursor, limit).all()
+    return split_page(rows, limit)
+
+def keyset_select(statement, timestamp_column, id_column, cursor=None, limit=50):
+    """
+    Seek, order and limit a Query or select() for one keyset page
+    
+    Used directly where the rows are fetched some other way, e.g. through
+    an async session; pass the fetched rows to split_page().
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            timestamp_column < timestamp,
+            and_(timestamp_column == timestamp, id_column < row_id)
+        ))
+    
+    # Fetch one extra row to learn whether another page exists
+    return statement.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+
+def split_page(rows, limit):
+    """
+    Trim rows fetched by a keyset_select() statement to one page
+    
+    Returns:
+        tuple: (rows, next_cursor), next_cursor is None on the last page
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        # Rows may be model instances or (model, ...) tuples from a join
+        item = last[0] if isinstance(last, tuple) or hasattr(last, '_fields') else last
+        next_cursor = encode_cursor(item.timestamp, item.id)
+    
+    return rows, next_cursor
+
+class CountCache:
+    """
+    Remembers COUNT(*) results per filter combination for a few seconds
+    
+    Paging through a filtered list then costs one count per ttl instead of
+    one per page view. Totals may lag new rows by up to ttl seconds.
+    """
+    
+    def __init__(self, ttl=60, maxsize=1000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._counts = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, count):
+        """
+        Return the cached count for key, calling count() when it is missing or stale
+        
+        Returns:
+            tuple: (total, is_cached)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(key)
+        if entry and entry[1] > now:
+            return entry[0], True
+        
+        total = count()
+        with self._lock:
+            if len(self._counts) >= self.maxsize:
+                self._counts.clear()
+            self._counts[key] = (total, now + self.ttl)
+        return total, False
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, select, delete, insert, update
+from sqlalchemy.dialects import sqlite, postgresql
+from .models import (
+    User, RequestHistory, RequestStatsDaily, RequestStatsHourly,
+    UserRequestStats, UserSignupDaily
+)
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def _dialect_name(executor):
+    """Dialect name for a Connection or a Session"""
+    dialect = getattr(executor, 'dialect', None) or executor.get_bind().dialect
+    return dialect.name
+
+def increment_counters(executor, model, key, rows):
+    """
+    Add counter values to rollup rows, creating rows that don't exist yet
+    
+    Args:
+        executor: Connection or Session to run on
+        model: Rollup model class
+        key (str): Primary key column name
+        rows (list): Dicts of the key and the amounts to add to each counter
+    """
+    if not rows:
+        return
+    
+    table = model.__table__
+    counters = [name for name in rows[0] if name != key]
+    upsert = UPSERT_INSERTS.get(_dialect_name(executor))
+    
+    if upsert is not None:
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={name: table.c[name] + stmt.excluded[name] for name in counters}
+        )
+        executor.execute(stmt, rows)
+        return
+    
+    # Portable fallback: update, then insert the rows that were missing
+    for row in rows:
+        result = executor.execute(
+            update(table)
+            .where(table.c[key] == row[key])
+            .values({name: table.c[name] + row[name] for name in counters})
+        )
+        if result.rowcount == 0:
+            executor.execute(insert(table), [row])
+
+def _request_rollups(rows):
+    """Aggregate history rows into per-day, per-hour and per-user counters"""
+    daily = defaultdict(lambda: [0, 0, 0])
+    hourly = defaultdict(lambda: [0, 0, 0])
+    users = defaultdict(lambda: [0, 0, 0])
+    
+    for user_id, is_spam, timestamp in rows:
+        column = 1 if is_spam else 2
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        for bucket in (daily[timestamp.date()], hourly[hour], users[user_id]):
+            bucket[0] += 1
+            bucket[column] += 1
+    
+    def as_rows(counts, key):
+        return [
+            {key: value, 'total': total, 'spam': spam, 'ham': ham}
+            for value, (total, spam, ham) in counts.items()
+        ]
+    
+    return as_rows(daily, 'date'), as_rows(hourly, 'hour'), as_rows(users, 'user_id')
+
+def record_requests(executor, rows):
+    """
+    Update the request rollups for newly written history rows
+    
+    Call in the same transaction as the history insert so both commit
+    together.
+    
+    Args:
+        executor: Connection or Session to run on
+        rows (list): Dicts with user_id, is_spam and timestamp
+    """
+    daily, hourly, users = _request_rollups(
+        (row['user_id'], row['is_spam'], row['timestamp']) for row in rows
+    )
+    increment_counters(executor, RequestStatsDaily, 'date', daily)
+    increment_counters(executor, RequestStatsHourly, 'hour', hourly)
+    increment_counters(executor, UserRequestStats, 'user_id', users)
+
+@event.listens_for(User, 'after_insert')
+def record_signup(mapper, connection, target):
+    """Count every new user in the signups rollup"""
+    created_at = target.created_at or datetime.utcnow()
+    increment_counters(connection, UserSignupDaily, 'date', [{'date': created_at.date(), 'count': 1}])
+
+def rebuild_rollups(connection, chunk_size=10000):
+    """
+    Recompute every rollup table from request_history and users
+    
+    Streams the base tables, so memory grows with the number of days and
+    users rather than with the number of requests.
+    
+    Args:
+        connection (Connection): Connection inside a transaction
+        chunk_size (int): Rows fetched per round trip
+    """
+    for model in (RequestStatsDaily, RequestStatsHourly, UserRequestStats, UserSignupDaily):
+        connection.execute(delete(model.__table__))
+    
+    history = connection.execution_options(yield_per=chunk_size).execute(
+        select(RequestHistory.user_id, RequestHistory.is_spam, RequestHistory.timestamp)
+    )
+    daily, hourly, users = _request_rollups(history)
+    for model, rows in ((RequestStatsDaily, daily), (RequestStatsHourly, hourly), (UserRequestStats, users)):
+        if rows:
+            connection.execute(insert(model.__table__), rows)
+    
+    signups = defaultdict(int)
+    for created_at, in connection.execute(select(User.created_at)):
+        signups[created_at.date()] += 1
+    if signups:
+        connection.execute(
+            insert(UserSignupDaily.__table__),
+            [{'date': date, 'count': count} for date, count in signups.items()]
+        )
+
+@event.listens_for(User, 'after_delete')
+def forget_user(mapper, connection, target):
+    """Drop the per-user counters of a deleted user"""
+    connection.execute(delete(UserRequestStats.__table__).where(UserRequestStats.user_id == target.id))
@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for Spam Shield.
+
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Import the app (and load the model) once in the master so forked workers
+# share the model pages copy-on-write instead of each loading their own copy
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+def when_ready(server):
+    """Move everything loaded so far out of the garbage collector's reach"""
+    if server.cfg.preload_app:
+        # Collections would otherwise touch every preloaded object and
+        # un-share its pages in each worker
+        gc.freeze()
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master"""
+    if server.cfg.preload_app:
+        from app import app
+        from database.models import db
+        
+        with app.app_context():
+            db.engine.dispose(close=False)
@@ -0,0 +1,33 @@
+"""Add the feedback table for online training
+
+Revision ID: add_feedback_table
+Revises: add_spam_pattern_tables
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_feedback_table'
+down_revision = 'add_spam_pattern_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'feedback',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('request_id', sa.Integer(), sa.ForeignKey('request_history.id'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('is_spam', sa.Boolean(), nullable=False),
+        sa.Column('from_admin', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('trained_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('request_id', 'user_id', name='uq_feedback_request_user')
+    )
+    op.create_index('ix_feedback_trained_at', 'feedback', ['trained_at'])
+
+def downgrade():
+    op.drop_index('ix_feedback_trained_at', table_name='feedback')
+    op.drop_table('feedback')
@@ -0,0 +1,31 @@
+"""Add indexes for request_history and guest_requests query patterns
+
+Revision ID: add_request_history_indexes
+Revises: add_is_admin_column
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_request_history_indexes'
+down_revision = 'add_is_admin_column'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # /api/history: WHERE user_id = ? ORDER BY timestamp DESC
+    op.create_index('ix_request_history_user_id_timestamp', 'request_history', ['user_id', sa.text('timestamp DESC')])
+    # Spam/ham counts and result-filtered admin browsing
+    op.create_index('ix_request_history_is_spam_timestamp', 'request_history', ['is_spam', 'timestamp'])
+    # Unfiltered admin browsing and date-range stats
+    op.create_index('ix_request_history_timestamp', 'request_history', ['timestamp'])
+    # Guest limit lookups by IP
+    op.create_index('ix_guest_requests_ip_address', 'guest_requests', ['ip_address'])
+
+def downgrade():
+    op.drop_index('ix_guest_requests_ip_address', table_name='guest_requests')
+    op.drop_index('ix_request_history_timestamp', table_name='request_history')
+    op.drop_index('ix_request_history_is_spam_timestamp', table_name='request_history')
+    op.drop_index('ix_request_history_user_id_timestamp', table_name='request_history')
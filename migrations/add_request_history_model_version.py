@@ -0,0 +1,22 @@
+"""Add model_version to request_history
+
+Revision ID: add_request_history_model_version
+Revises: add_feedback_table
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_request_history_model_version'
+down_revision = 'add_feedback_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows keep NULL: the version that scored them is unknown
+    op.add_column('request_history', sa.Column('model_version', sa.String(length=64), nullable=True))
+
+def downgrade():
+    op.drop_column('request_history', 'model_version')
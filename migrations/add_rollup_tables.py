@@ -0,0 +1,42 @@
+"""Add pre-aggregated stats rollup tables
+
+Revision ID: add_rollup_tables
+Revises: add_request_history_indexes
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_rollup_tables'
+down_revision = 'add_request_history_indexes'
+branch_labels = None
+depends_on = None
+
+def _counters():
+    return [
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('spam', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ham', sa.Integer(), nullable=False, server_default='0')
+    ]
+
+def upgrade():
+    op.create_table('request_stats_daily', sa.Column('date', sa.Date(), primary_key=True), *_counters())
+    op.create_table('request_stats_hourly', sa.Column('hour', sa.DateTime(), primary_key=True), *_counters())
+    op.create_table('user_request_stats', sa.Column('user_id', sa.Integer(), primary_key=True), *_counters())
+    op.create_table(
+        'user_signups_daily',
+        sa.Column('date', sa.Date(), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0')
+    )
+    
+    # Backfill from the existing history and users
+    from database.rollups import rebuild_rollups
+    rebuild_rollups(op.get_bind())
+
+def downgrade():
+    op.drop_table('user_signups_daily')
+    op.drop_table('user_request_stats')
+    op.drop_table('request_stats_hourly')
+    op.drop_table('request_stats_daily')
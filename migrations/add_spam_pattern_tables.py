@@ -0,0 +1,46 @@
+"""Add tables for the spam pattern miner
+
+Revision ID: add_spam_pattern_tables
+Revises: add_rollup_tables
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_spam_pattern_tables'
+down_revision = 'add_rollup_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'pattern_counts',
+        sa.Column('pattern', sa.String(length=255), primary_key=True),
+        sa.Column('spam_docs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ham_docs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('spam_confidence', sa.Float(), nullable=False, server_default='0')
+    )
+    op.create_table(
+        'pattern_miner_state',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('spam_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ham_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True)
+    )
+    op.create_table(
+        'spam_patterns',
+        sa.Column('rank', sa.Integer(), primary_key=True),
+        sa.Column('pattern', sa.String(length=255), nullable=False),
+        sa.Column('spam_docs', sa.Integer(), nullable=False),
+        sa.Column('ham_docs', sa.Integer(), nullable=False),
+        sa.Column('lift', sa.Float(), nullable=False),
+        sa.Column('avg_confidence', sa.Float(), nullable=False)
+    )
+
+def downgrade():
+    op.drop_table('spam_patterns')
+    op.drop_table('pattern_miner_state')
+    op.drop_table('pattern_counts')
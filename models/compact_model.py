@@ -0,0 +1,292 @@
+import os
+import json
+import zlib
+import struct
+import tempfile
+import itertools
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import logsumexp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+MAGIC = b'SSCOMPT1'
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+# Vectorizer parameters that are stored in the artifact header. Anything that
+# can hold a callable (tokenizer, preprocessor, custom analyzer) is rejected.
+ANALYZER_PARAMS = (
+    'analyzer', 'lowercase', 'strip_accents', 'stop_words', 'token_pattern',
+    'ngram_range', 'encoding', 'decode_error'
+)
+TFIDF_PARAMS = ('binary', 'norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+
+def term_hash(term):
+    """Stable 64-bit hash of a term, identical in every process"""
+    data = term.encode('utf-8')
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def export_compact(pipeline, path):
+    """
+    Write a fitted TF-IDF + MultinomialNB pipeline as a compact artifact
+
+    The file holds a small JSON header followed by raw, 64-byte aligned
+    NumPy arrays: a hash index over the vocabulary, the vocabulary strings,
+    the IDF vector and the class log-probabilities. It is written to a
+    temporary file and renamed into place.
+
+    Args:
+        pipeline (Pipeline): Fitted pipeline with 'vectorizer' and 'classifier' steps
+        path (str): Destination file
+    """
+    vectorizer = pipeline.named_steps['vectorizer']
+    classifier = pipeline.named_steps['classifier']
+
+    params = vectorizer.get_params()
+    for name in ('preprocessor', 'tokenizer'):
+        if params[name] is not None:
+            raise ValueError(f"Cannot export a vectorizer with a custom {name}")
+    if callable(params['analyzer']):
+        raise ValueError("Cannot export a vectorizer with a custom analyzer")
+
+    header_params = {name: params[name] for name in ANALYZER_PARAMS + TFIDF_PARAMS}
+    header_params['ngram_range'] = list(params['ngram_range'])
+    if isinstance(params['stop_words'], (list, set, frozenset)):
+        header_params['stop_words'] = sorted(params['stop_words'])
+
+    # Order the vocabulary by hash so lookups are a binary search
+    terms = sorted(vectorizer.vocabulary_.items(), key=lambda item: (term_hash(item[0]), item[0]))
+    encoded = [term.encode('utf-8') for term, _ in terms]
+    term_offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(term) for term in encoded], out=term_offsets[1:])
+
+    arrays = {
+        'term_hashes': np.array([term_hash(term) for term, _ in terms], dtype='<u8'),
+        'term_columns': np.array([column for _, column in terms], dtype='<i8'),
+        'term_offsets': term_offsets,
+        'term_bytes': np.frombuffer(b''.join(encoded), dtype='u1'),
+        'idf': np.asarray(vectorizer.idf_, dtype='<f8'),
+        'feature_log_prob': np.asarray(classifier.feature_log_prob_, dtype='<f8'),
+        'class_log_prior': np.asarray(classifier.class_log_prior_, dtype='<f8'),
+        'classes': np.asarray(classifier.classes_, dtype='<i8')
+    }
+
+    # Lay out the arrays after the header; the header size depends on the
+    # offsets, so reserve a generous fixed prefix for it
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'vectorizer': header_params,
+        'arrays': layout
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', data_start))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class CompactModel:
+    """
+    Read-only spam model backed by a memory-mapped compact artifact
+
+    Exposes the parts of the sklearn Pipeline interface that SpamDetector
+    uses (classes_, transform and predict_proba), so it can stand in for the
+    pickled pipeline. All arrays are np.memmap views of the same file, so
+    every worker process shares one physical copy through the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compact spam model")
+            data_start, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(data_start - len(MAGIC) - 8).rstrip(b'\0'))
+
+        if header['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model version {header['format_version']}")
+
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if np.prod(shape) == 0:
+                array = np.zeros(shape, dtype=spec['dtype'])
+            else:
+                # Plain ndarray views of the mapping index faster than np.memmap
+                array = np.memmap(path, dtype=spec['dtype'], mode='r',
+                                  offset=data_start + spec['offset'], shape=shape).view(np.ndarray)
+            setattr(self, name, array)
+
+        params = header['vectorizer']
+        params['ngram_range'] = tuple(params['ngram_range'])
+        self.params = params
+        self._analyzer = TfidfVectorizer(
+            **{name: params[name] for name in ANALYZER_PARAMS}
+        ).build_analyzer()
+        self.classes_ = np.asarray(self.classes)
+
+    @property
+    def n_features(self):
+        return self.idf.shape[0]
+
+    def _columns(self, terms):
+        """
+        Vocabulary column of each distinct term
+
+        Returns:
+            ndarray: One column per term, -1 for terms not in the vocabulary
+        """
+        columns = np.full(len(terms), -1, dtype=np.int64)
+        size = len(self.term_hashes)
+        if not terms or not size:
+            return columns
+
+        # term_hash over the whole batch, without a Python call per term
+        encoded = [term.encode('utf-8') for term in terms]
+        hashes = np.fromiter(map(zlib.crc32, encoded), dtype='<u8', count=len(encoded)) << np.uint64(32)
+        hashes |= np.fromiter(map(zlib.adler32, encoded), dtype='<u8', count=len(encoded))
+        # Searching in sorted order keeps each binary search near the last one
+        order = np.argsort(hashes)
+        positions = np.empty(len(hashes), dtype=np.int64)
+        positions[order] = np.searchsorted(self.term_hashes, hashes[order])
+        np.minimum(positions, size - 1, out=positions)
+
+        # Only terms whose hash is in the index need their bytes compared;
+        # compare them all at once as one concatenated buffer
+        candidates = np.flatnonzero(self.term_hashes[positions] == hashes)
+        positions = positions[candidates]
+        starts = self.term_offsets[positions].astype(np.int64)
+        lengths = self.term_offsets[positions + 1].astype(np.int64) - starts
+        query_lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))[candidates]
+        same_length = np.flatnonzero((lengths == query_lengths) & (lengths > 0))
+        matched = np.zeros(len(candidates), dtype=bool)
+        if len(same_length):
+            query = np.frombuffer(b''.join(encoded[i] for i in candidates[same_length].tolist()), dtype='u1')
+            segment_lengths = lengths[same_length]
+            segment_starts = np.zeros(len(same_length), dtype=np.int64)
+            np.cumsum(segment_lengths[:-1], out=segment_starts[1:])
+            stored = self.term_bytes[np.repeat(starts[same_length] - segment_starts, segment_lengths) + np.arange(len(query))]
+            matched[same_length] = np.logical_and.reduceat(stored == query, segment_starts)
+        columns[candidates[matched]] = self.term_columns[positions[matched]]
+
+        # Two vocabulary terms can share a hash; walk the rest of the run
+        # of equal hashes for candidates that didn't match the first entry
+        term_bytes = memoryview(self.term_bytes)
+        for i, position in zip(candidates[~matched].tolist(), positions[~matched].tolist()):
+            position += 1
+            while position < size and self.term_hashes[position] == hashes[i]:
+                if term_bytes[self.term_offsets[position]:self.term_offsets[position + 1]] == encoded[i]:
+                    columns[i] = self.term_columns[position]
+                    break
+                position += 1
+        return columns
+
+    def transform(self, texts):
+        """
+        Turn texts into the same TF-IDF matrix the fitted vectorizer produces
+
+        The terms of the whole batch are deduplicated and looked up once,
+        and the counts are built with one sort instead of per text.
+
+        Args:
+            texts (list): The texts to vectorize
+
+        Returns:
+            csr_matrix: One L2-normalized TF-IDF row per text
+        """
+        tokens = [self._analyzer(text) for text in texts]
+        flat = list(itertools.chain.from_iterable(tokens))
+        terms = list(dict.fromkeys(flat))
+        term_index = dict(zip(terms, range(len(terms))))
+        columns = self._columns(terms)[np.array([term_index[token] for token in flat], dtype=np.int64)]
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), [len(row) for row in tokens])
+        known = columns >= 0
+        rows, columns = rows[known], columns[known]
+
+        # sklearn applies IDF weights as a sparse product with a diagonal
+        # matrix, which leaves each row's columns in descending order. Build
+        # rows in the same order so later sums are bit-for-bit identical.
+        n_features = self.n_features
+        if self.params['use_idf']:
+            columns = n_features - 1 - columns
+        # Sorting (row, column) keys counts repeated terms and orders each row
+        keys, counts = np.unique(rows * n_features + columns, return_counts=True)
+        rows, columns = np.divmod(keys, n_features)
+        if self.params['use_idf']:
+            columns = n_features - 1 - columns
+
+        indptr = np.zeros(len(texts) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=len(texts)), out=indptr[1:])
+        X = sp.csr_matrix(
+            (counts.astype(np.float64), columns.astype(np.int32), indptr),
+            shape=(len(texts), n_features)
+        )
+
+        # Mirror TfidfTransformer.transform
+        if self.params['binary']:
+            X.data.fill(1)
+        if self.params['sublinear_tf']:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.params['use_idf']:
+            X.data *= self.idf[X.indices]
+        if self.params['norm']:
+            X = normalize(X, norm=self.params['norm'], copy=False)
+        return X
+
+    def predict_proba(self, texts):
+        """
+        Class probabilities for each text, matching MultinomialNB.predict_proba
+
+        Args:
+            texts (list): The texts to classify
+
+        Returns:
+            ndarray: Array of shape (len(texts), n_classes)
+        """
+        return self.predict_proba_features(self.transform(texts))
+
+    def predict_proba_features(self, X):
+        """
+        Class probabilities for an already vectorized matrix from transform()
+
+        Args:
+            X (csr_matrix): TF-IDF rows
+
+        Returns:
+            ndarray: Array of shape (X.shape[0], n_classes)
+        """
+        jll = X @ self.feature_log_prob.T + self.class_log_prior
+        return np.exp(jll - np.atleast_2d(logsumexp(jll, axis=1)).T)
+
+    def predict(self, texts):
+        """
+        Predicted class for each text, matching Pipeline.predict
+
+        Args:
+            texts (list): The texts to classify
+
+        Returns:
+            ndarray: One class label per text
+        """
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
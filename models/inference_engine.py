@@ -0,0 +1,190 @@
+import math
+import numpy as np
+from scipy.special import logsumexp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from .compact_model import ANALYZER_PARAMS, TFIDF_PARAMS
+
+class InferenceEngine:
+    """
+    TF-IDF + MultinomialNB scorer compiled to plain Python lookups
+
+    Scoring a message is: split it into terms, look each term up in a dict,
+    weight the counts by IDF, L2-normalize and take one dot product per
+    class. The engine does exactly that over flat lists, without building
+    a scipy sparse matrix or going through the sklearn Pipeline, which is
+    where most of the time goes for a single short message.
+
+    Results are bit-for-bit identical to Pipeline.predict_proba: every sum
+    is accumulated in the order scipy's CSR kernels use (columns descending
+    after the IDF product), and the final softmax is the same NumPy/SciPy
+    expression MultinomialNB uses. sublinear_tf is not supported, because
+    reproducing NumPy's vectorized log exactly would need the whole batch
+    as one array; compiling such a model raises ValueError.
+
+    Exposes classes_, params, transform and predict_proba_features like
+    CompactModel, so SpamDetector can use either.
+    """
+
+    def __init__(self, vocabulary, idf, feature_log_prob, class_log_prior, classes, params):
+        if params['sublinear_tf']:
+            raise ValueError("The inference engine does not support sublinear_tf")
+
+        self.params = dict(params)
+        self.vocabulary = vocabulary
+        self.idf = [float(value) for value in idf] if params['use_idf'] else None
+        # One weight list per class, indexed by column
+        self.feature_log_prob = [row.tolist() for row in np.asarray(feature_log_prob, dtype=np.float64)]
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self._analyzer = TfidfVectorizer(
+            **{name: params[name] for name in ANALYZER_PARAMS}
+        ).build_analyzer()
+        # sklearn leaves IDF-weighted rows with their columns in descending order
+        self._descending = bool(params['use_idf'])
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Compile a fitted pipeline with 'vectorizer' and 'classifier' steps
+
+        Raises:
+            ValueError: If the vectorizer uses settings the engine can't reproduce
+        """
+        vectorizer = pipeline.named_steps['vectorizer']
+        classifier = pipeline.named_steps['classifier']
+        params = vectorizer.get_params()
+        for name in ('preprocessor', 'tokenizer'):
+            if params[name] is not None:
+                raise ValueError(f"Cannot compile a vectorizer with a custom {name}")
+        if callable(params['analyzer']):
+            raise ValueError("Cannot compile a vectorizer with a custom analyzer")
+
+        return cls(
+            dict(vectorizer.vocabulary_),
+            vectorizer.idf_ if params['use_idf'] else (),
+            classifier.feature_log_prob_,
+            classifier.class_log_prior_,
+            classifier.classes_,
+            {name: params[name] for name in ANALYZER_PARAMS + TFIDF_PARAMS}
+        )
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Compile a loaded CompactModel
+
+        Raises:
+            ValueError: If the vectorizer uses settings the engine can't reproduce
+        """
+        offsets = compact.term_offsets.tolist()
+        term_bytes = compact.term_bytes.tobytes()
+        vocabulary = {
+            term_bytes[offsets[i]:offsets[i + 1]].decode('utf-8'): column
+            for i, column in enumerate(compact.term_columns.tolist())
+        }
+        return cls(
+            vocabulary,
+            compact.idf,
+            compact.feature_log_prob,
+            compact.class_log_prior,
+            compact.classes_,
+            compact.params
+        )
+
+    @property
+    def n_features(self):
+        return len(self.feature_log_prob[0])
+
+    def transform_one(self, text):
+        """
+        Normalized TF-IDF weights of one text
+
+        Returns:
+            tuple: (columns, values) in the order sklearn stores the row
+        """
+        vocabulary = self.vocabulary
+        counts = {}
+        for term in self._analyzer(text):
+            column = vocabulary.get(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+
+        columns = sorted(counts, reverse=self._descending)
+        if self.params['binary']:
+            values = [1.0] * len(columns)
+        else:
+            values = [float(counts[column]) for column in columns]
+        if self.idf is not None:
+            idf = self.idf
+            values = [value * idf[column] for value, column in zip(values, columns)]
+
+        # Mirror sklearn's inplace_csr_row_normalize_l1/l2: one running sum,
+        # rows that sum to zero are left alone
+        norm = self.params['norm']
+        if norm == 'l2':
+            total = 0.0
+            for value in values:
+                total += value * value
+            if total != 0.0:
+                total = math.sqrt(total)
+                values = [value / total for value in values]
+        elif norm == 'l1':
+            total = 0.0
+            for value in values:
+                total += abs(value)
+            if total != 0.0:
+                values = [value / total for value in values]
+        return columns, values
+
+    def transform(self, texts):
+        """
+        Normalized TF-IDF rows of several texts
+
+        Returns:
+            list: (columns, values) per text, for predict_proba_features
+        """
+        return [self.transform_one(text) for text in texts]
+
+    def joint_log_likelihood(self, rows):
+        """
+        Unnormalized class log-probabilities of transformed rows
+
+        Returns:
+            ndarray: Array of shape (len(rows), n_classes)
+        """
+        jll = np.empty((len(rows), len(self.feature_log_prob)), dtype=np.float64)
+        for i, (columns, values) in enumerate(rows):
+            for k, weights in enumerate(self.feature_log_prob):
+                # Accumulated in row order, like scipy's csr_matvecs
+                total = 0.0
+                for column, value in zip(columns, values):
+                    total += value * weights[column]
+                jll[i, k] = total
+        jll += self.class_log_prior
+        return jll
+
+    def predict_proba_features(self, rows):
+        """
+        Class probabilities for rows from transform(), matching MultinomialNB.predict_proba
+
+        Returns:
+            ndarray: Array of shape (len(rows), n_classes)
+        """
+        jll = self.joint_log_likelihood(rows)
+        return np.exp(jll - np.atleast_2d(logsumexp(jll, axis=1)).T)
+
+    def predict_proba(self, texts):
+        """
+        Class probabilities for each text, matching Pipeline.predict_proba
+
+        Args:
+            texts (list): The texts to classify
+
+        Returns:
+            ndarray: Array of shape (len(texts), n_classes)
+        """
+        return self.predict_proba_features(self.transform(texts))
+
+    def predict(self, texts):
+        """Predicted class for each text, matching Pipeline.predict"""
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import queue
+import threading
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from . import inference_worker
+
+def _main_reruns_app(app):
+    """
+    True if __main__ is a script that builds the app, e.g. python app.py
+
+    spawn re-imports __main__ in every child, so each pool process would
+    build a second copy of the whole web app before it could score.
+    """
+    main = sys.modules.get('__main__')
+    return main is not None and any(value is app for value in vars(main).values())
+
+class _Pending:
+    """Texts of one predict_batch call waiting to be scored"""
+
+    __slots__ = ('texts', 'model_version', 'future')
+
+    def __init__(self, texts, model_version):
+        self.texts = texts
+        self.model_version = model_version
+        self.future = Future()
+
+class InferencePool:
+    """
+    Score predictions in a pool of worker processes
+
+    Scoring holds the GIL, so threads of one web worker can't use more than
+    one core for it. With a pool, request threads hand their texts to a
+    dispatcher thread, which collects the requests arriving within
+    max_latency_ms (up to max_batch_size texts), sends them to a child
+    process as one predict_proba call and hands each request its slice of
+    the results. Each child loads the model once at startup and loads a
+    newer registry version the first time it is asked for it, so results
+    always come from the version the caller saw.
+
+    The processes are started on first use in each web worker, so the pool
+    is never shared across a fork. They run models.inference_worker, but
+    spawn still re-imports __main__, so the pool is only supported under a
+    server such as gunicorn or uvicorn; when the app is run as a script it
+    stays off and predictions are scored in the request thread.
+    """
+
+    def __init__(self, size=0, max_latency_ms=2, max_batch_size=64, timeout=10):
+        self.size = size
+        self.max_latency_ms = max_latency_ms
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.app = None
+        self.detector = None
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._pid = None
+        self._executor = None
+        self._queue = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app, detector=None):
+        """
+        Configure the pool and attach it to the detector when it is enabled
+
+        Args:
+            app (Flask): The application whose config sizes the pool
+            detector (SpamDetector): The detector that dispatches to the pool
+        """
+        self.app = app
+        self.detector = detector or app.extensions.get('spam_detector')
+        self.size = app.config.get('INFERENCE_POOL_SIZE', 0)
+        self.max_latency_ms = app.config.get('INFERENCE_MAX_BATCH_LATENCY_MS', 2)
+        self.max_batch_size = app.config.get('INFERENCE_MAX_BATCH_SIZE', 64)
+        self.timeout = app.config.get('INFERENCE_TIMEOUT', 10)
+        app.extensions['inference_pool'] = self
+        if self.enabled:
+            self.detector.inference_pool = self
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def start(self):
+        """
+        Start the processes and the dispatcher in this process, once
+
+        Raises:
+            RuntimeError: If the app runs as a script, which turns the pool off
+        """
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self.app is not None and _main_reruns_app(self.app):
+                self.size = 0
+                raise RuntimeError("Inference pool disabled: run the app under gunicorn or uvicorn to use it")
+            self._executor = self._new_executor()
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _new_executor(self):
+        # spawn rather than fork: web workers run threads, and a forked
+        # child could inherit a lock some other thread was holding
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inference_worker.init_child,
+            initargs=(self.detector.model_format, os.path.abspath(self.detector.registry_path))
+        )
+
+    def score(self, texts, model_version):
+        """
+        Score texts in the pool, waiting for the result
+
+        Args:
+            texts (list): The texts to classify
+            model_version (str): Registry version to score them with
+
+        Returns:
+            list: (is_spam, confidence) tuples in the same order as texts
+        """
+        return self.submit(texts, model_version).result(timeout=self.timeout)
+
+    def submit(self, texts, model_version):
+        """Queue texts for the next batch; returns a Future of their results"""
+        self.start()
+        pending = _Pending(list(texts), model_version)
+        self._queue.put(pending)
+        return pending.future
+
+    def _dispatch(self):
+        """Collect queued requests into batches and send them to the pool"""
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_latency_ms / 1000
+            while count < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                count += len(pending.texts)
+
+            # Requests that raced a model reload may ask for different versions
+            by_version = defaultdict(list)
+            for pending in batch:
+                by_version[pending.model_version].append(pending)
+            for model_version, group in by_version.items():
+                self._send(group, model_version)
+
+    def _send(self, group, model_version):
+        texts = [text for pending in group for text in pending.texts]
+        self.requests += len(group)
+        self.batches += 1
+        self.texts += len(texts)
+        try:
+            try:
+                future = self._executor.submit(inference_worker.score, texts, model_version)
+            except BrokenProcessPool:
+                # A child died; replace the pool instead of failing from now on
+                print("Inference pool broken. Restarting its processes...")
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                future = self._executor.submit(inference_worker.score, texts, model_version)
+        except Exception as e:
+            for pending in group:
+                pending.future.set_exception(e)
+            return
+
+        def deliver(future):
+            error = future.exception()
+            start = 0
+            for pending in group:
+                if error is not None:
+                    pending.future.set_exception(error)
+                    continue
+                end = start + len(pending.texts)
+                pending.future.set_result(future.result()[start:end])
+                start = end
+
+        future.add_done_callback(deliver)
+
+    def stats(self):
+        """Batching counters of this worker for the admin stats"""
+        return {
+            'enabled': self.enabled,
+            'size': self.size,
+            'requests': self.requests,
+            'batches': self.batches,
+            'texts': self.texts,
+            'mean_requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0,
+            'mean_batch_size': round(self.texts / self.batches, 2) if self.batches else 0
+        }
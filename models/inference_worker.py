@@ -0,0 +1,31 @@
+"""
+Entry point of the inference pool's processes
+
+Spawned children unpickle their initializer and task functions by module
+name, so they live here, importing only SpamDetector, rather than next to
+the pool and the rest of the web app.
+"""
+from .spam_model import SpamDetector
+
+# Detector and loaded (version, model) of this process, set by init_child
+_detector = None
+_model = (None, None)
+
+def init_child(model_format, registry_path):
+    """Load the live model version once when a pool process starts"""
+    global _detector, _model
+    _detector = SpamDetector()
+    _detector.model_format = model_format
+    _detector.registry_path = registry_path
+    version = _detector.get_registry().current()
+    if version is not None:
+        _model = (version, _detector.open_version(version))
+
+def score(texts, model_version):
+    """Score texts with the given model version, loading it on first use"""
+    global _model
+    version, model = _model
+    if version != model_version:
+        model = _detector.open_version(model_version)
+        _model = (model_version, model)
+    return _detector._score(texts, model)
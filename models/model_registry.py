@@ -0,0 +1,167 @@
+import os
+import pickle
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+from .compact_model import export_compact
+
+PICKLE_NAME = 'spam_classifier.pkl'
+COMPACT_NAME = 'spam_classifier.compact'
+CURRENT_NAME = 'CURRENT'
+
+class ModelRegistry:
+    """
+    Directory of versioned, immutable model artifacts
+
+    Each version is a subdirectory named <UTC timestamp>-<content hash>
+    holding the pickled pipeline and its compact export. A version is
+    built in a temporary directory and renamed into place, and the CURRENT
+    file naming the live version is replaced atomically, so readers only
+    ever see complete versions and a complete pointer.
+    """
+
+    def __init__(self, path, keep=5):
+        self.path = path
+        self.keep = keep
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def current_path(self):
+        return os.path.join(self.path, CURRENT_NAME)
+
+    def current(self):
+        """Name of the live version, or None if nothing was published yet"""
+        try:
+            with open(self.current_path) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and self.exists(version) else None
+
+    def exists(self, version):
+        return os.path.isfile(os.path.join(self.path, version, PICKLE_NAME))
+
+    def paths(self, version):
+        """(pickle_path, compact_path) of a version"""
+        directory = os.path.join(self.path, version)
+        return os.path.join(directory, PICKLE_NAME), os.path.join(directory, COMPACT_NAME)
+
+    def versions(self):
+        """Published versions, newest first"""
+        current = self.current()
+        found = []
+        for name in os.listdir(self.path):
+            if name.startswith('.') or not self.exists(name):
+                continue
+            # The directory is renamed into place once complete, so its
+            # mtime orders versions published within the same second
+            found.append((os.stat(os.path.join(self.path, name)).st_mtime_ns, name))
+
+        return [
+            {
+                'version': name,
+                'created_at': datetime.utcfromtimestamp(mtime / 1e9).isoformat(),
+                'is_current': name == current
+            }
+            for mtime, name in sorted(found, reverse=True)
+        ]
+
+    def publish(self, pipeline, activate=True):
+        """
+        Store a fitted pipeline as a new version
+
+        Args:
+            pipeline (Pipeline): Fitted pipeline with 'vectorizer' and 'classifier' steps
+            activate (bool): Make it the live version
+
+        Returns:
+            str: The new version name
+        """
+        data = pickle.dumps(pipeline)
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{hashlib.sha256(data).hexdigest()[:8]}"
+
+        def write(directory):
+            with open(os.path.join(directory, PICKLE_NAME), 'wb') as f:
+                f.write(data)
+            export_compact(pipeline, os.path.join(directory, COMPACT_NAME))
+
+        self._add_version(version, write)
+        if activate:
+            self.activate(version)
+        return version
+
+    def import_files(self, pickle_path, compact_path=None, activate=True):
+        """
+        Store existing artifact files as a new version
+
+        Args:
+            pickle_path (str): Pickled pipeline
+            compact_path (str): Its compact export; made from the pickle if missing
+            activate (bool): Make it the live version
+
+        Returns:
+            str: The new version name
+        """
+        with open(pickle_path, 'rb') as f:
+            data = f.read()
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{hashlib.sha256(data).hexdigest()[:8]}"
+
+        def write(directory):
+            shutil.copyfile(pickle_path, os.path.join(directory, PICKLE_NAME))
+            if compact_path and os.path.exists(compact_path):
+                shutil.copyfile(compact_path, os.path.join(directory, COMPACT_NAME))
+            else:
+                export_compact(pickle.loads(data), os.path.join(directory, COMPACT_NAME))
+
+        self._add_version(version, write)
+        if activate:
+            self.activate(version)
+        return version
+
+    def _add_version(self, version, write):
+        """Build a version in a temporary directory, then rename it into place"""
+        if self.exists(version):
+            # Same content published within the same second
+            return
+
+        tmp_dir = tempfile.mkdtemp(dir=self.path, prefix='.tmp-')
+        try:
+            write(tmp_dir)
+            for name in os.listdir(tmp_dir):
+                os.chmod(os.path.join(tmp_dir, name), 0o644)
+            os.chmod(tmp_dir, 0o755)
+            os.rename(tmp_dir, os.path.join(self.path, version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def activate(self, version):
+        """
+        Point CURRENT at a published version
+
+        Raises:
+            ValueError: If the version does not exist
+        """
+        if not self.exists(version):
+            raise ValueError(f"Unknown model version: {version}")
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(version + '\n')
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.current_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.prune()
+
+    def prune(self):
+        """Delete the oldest versions beyond keep, never the live one"""
+        if not self.keep:
+            return
+        current = self.current()
+        for info in self.versions()[self.keep:]:
+            if info['version'] != current:
+                shutil.rmtree(os.path.join(self.path, info['version']), ignore_errors=True)
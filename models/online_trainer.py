@@ -0,0 +1,199 @@
+import threading
+from datetime import datetime
+import numpy as np
+from database.models import db, RequestHistory, Feedback
+
+class OnlineTrainer:
+    """
+    Incremental retraining of the spam model from labelled feedback
+
+    Pending feedback is applied with MultinomialNB.partial_fit on top of
+    the fitted pipeline. The TF-IDF vocabulary and IDF weights stay fixed,
+    so words the model has never seen are ignored until the next full
+    retrain; everything the vocabulary covers is learned without a refit.
+    The updated pipeline is published as a new registry version and
+    swapped in; other workers pick it up through SpamDetector.check_for_update.
+
+    partial_fit can't unlearn, so once the model has learned a request its
+    label is final: later labels for it are never applied, and the
+    feedback endpoint rejects ones that disagree.
+    """
+
+    def __init__(self, detector=None):
+        self.detector = detector
+        self.app = None
+        self.enabled = True
+        self.min_feedback = 20
+        self.max_feedback = 10000
+        self.sample_weight = 1.0
+        self.trusted_only = True
+        self.last_trained_at = None
+        self.last_result = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app, detector=None):
+        self.app = app
+        self.detector = detector or self.detector or app.extensions.get('spam_detector')
+        self.enabled = app.config.get('ONLINE_TRAINING', True)
+        self.min_feedback = app.config.get('ONLINE_TRAINING_MIN_FEEDBACK', 20)
+        self.max_feedback = app.config.get('ONLINE_TRAINING_MAX_FEEDBACK', 10000)
+        self.sample_weight = app.config.get('FEEDBACK_SAMPLE_WEIGHT', 1.0)
+        self.trusted_only = app.config.get('FEEDBACK_TRUSTED_ONLY', True)
+        app.extensions['online_trainer'] = self
+
+    def pending_query(self):
+        """Feedback the model has not learned from yet, oldest first"""
+        query = Feedback.query.filter(Feedback.trained_at.is_(None))
+        if self.trusted_only:
+            query = query.filter(Feedback.from_admin == True)
+        return query.order_by(Feedback.id)
+
+    def pending_count(self):
+        return self.pending_query().count()
+
+    def learned_label(self, request_id):
+        """
+        The label the model has learned for a request
+
+        Returns:
+            bool: is_spam of the learned label, or None if it has learned none
+        """
+        # Ordered the way authoritative() picked it
+        feedback = Feedback.query.filter(
+            Feedback.request_id == request_id,
+            Feedback.trained_at.isnot(None)
+        ).order_by(Feedback.from_admin.desc(), Feedback.created_at.desc(), Feedback.id.desc()).first()
+        return feedback.is_spam if feedback else None
+
+    def maybe_train(self):
+        """Start a background update once enough feedback is waiting"""
+        if self.enabled and self.pending_count() >= self.min_feedback:
+            return self.train_async()
+        return False
+
+    def train(self):
+        """
+        Apply pending feedback to the model now
+
+        Holds the detector's artifact lock from reading the pipeline until
+        the feedback is marked as trained, so two workers never apply the
+        same feedback or overwrite each other's update.
+
+        Returns:
+            dict: Number of feedback rows applied and the new model version
+        """
+        with self.detector._artifact_lock():
+            pending = db.session.query(Feedback, RequestHistory.text).join(
+                RequestHistory, Feedback.request_id == RequestHistory.id
+            ).filter(
+                Feedback.id.in_(self.pending_query().with_entities(Feedback.id).limit(self.max_feedback))
+            ).all()
+            if not pending:
+                return {'trained': 0, 'model_version': self.detector.model_version}
+
+            selected = self.authoritative(pending)
+            texts = [text for _, text in selected]
+            labels = np.array([1 if feedback.is_spam else 0 for feedback, _ in selected], dtype=int)
+
+            if selected:
+                pipeline = self.detector.load_pipeline()
+                vectorizer = pipeline.named_steps['vectorizer']
+                classifier = pipeline.named_steps['classifier']
+                classifier.partial_fit(
+                    vectorizer.transform(texts),
+                    labels,
+                    sample_weight=np.full(len(texts), self.sample_weight)
+                )
+                self.detector.publish_pipeline(pipeline)
+
+            # Superseded labels are consumed too, so they don't wait forever
+            now = datetime.utcnow()
+            for feedback, _ in pending:
+                feedback.trained_at = now
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+        # Swap the new version in here; other workers notice the changed pointer
+        if selected:
+            self.detector.reload()
+        self.last_trained_at = now
+        self.last_result = {
+            'trained': len(selected),
+            'superseded': len(pending) - len(selected),
+            'spam': int(labels.sum()),
+            'ham': int(len(labels) - labels.sum()),
+            'model_version': self.detector.model_version
+        }
+        if selected:
+            print(f"Model updated from {len(selected)} feedback labels")
+        return self.last_result
+
+    def authoritative(self, pending):
+        """
+        One label per request from the pending feedback
+
+        An admin's label wins over users' labels for the same request, and
+        the latest label wins among equals. User labels for a request an
+        admin has already labelled are dropped, and so are all labels for a
+        request the model learned in an earlier update.
+
+        Args:
+            pending (list): (Feedback, text) pairs
+
+        Returns:
+            list: The (Feedback, text) pairs to train on
+        """
+        request_ids = {feedback.request_id for feedback, _ in pending}
+        admin_labelled = {
+            request_id for request_id, in db.session.query(Feedback.request_id).filter(
+                Feedback.request_id.in_(request_ids),
+                Feedback.from_admin == True
+            )
+        }
+        # Pending rows are untrained, so any trained row is from an earlier update
+        learned = {
+            request_id for request_id, in db.session.query(Feedback.request_id).filter(
+                Feedback.request_id.in_(request_ids),
+                Feedback.trained_at.isnot(None)
+            )
+        }
+
+        best = {}
+        for feedback, text in pending:
+            if feedback.request_id in learned:
+                continue
+            if feedback.request_id in admin_labelled and not feedback.from_admin:
+                continue
+            current = best.get(feedback.request_id)
+            if current is None or (feedback.created_at, feedback.id) > (current[0].created_at, current[0].id):
+                best[feedback.request_id] = (feedback, text)
+        return list(best.values())
+
+    def train_async(self):
+        """Train in a background thread unless a run is already going"""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run, name='online-trainer', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        with self.app.app_context():
+            try:
+                self.train()
+            except Exception as e:
+                print(f"Online training failed: {e}")
+
+    def stats(self):
+        """Pending feedback and the last update for the admin stats"""
+        return {
+            'enabled': self.enabled,
+            'pending': self.pending_count(),
+            'last_trained_at': self.last_trained_at.isoformat() if self.last_trained_at else None,
+            'last_result': self.last_result
+        }
@@ -0,0 +1,231 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sklearn.feature_extraction.text import CountVectorizer
+from sqlalchemy import select, delete, insert, update
+from database.models import db, RequestHistory, PatternCount, PatternMinerState, SpamPattern
+from database.rollups import increment_counters
+
+MAX_PATTERN_LENGTH = 255
+
+class PatternMiner:
+    """
+    Incremental spam pattern miner
+
+    Streams request_history rows newer than the last run, counts in how
+    many spam and ham requests each n-gram appears (using the spam model's
+    own tokenization) and adds those counts to the pattern_counts table.
+    Patterns are then ranked by lift, how much more often they occur in
+    spam than in ham, and the top ones are stored in spam_patterns so the
+    stats page only reads a few precomputed rows.
+    """
+
+    def __init__(self, detector=None):
+        self.detector = detector
+        self.app = None
+        self.max_ngram = 2
+        self.top_k = 50
+        self.min_support = 5
+        self.smoothing = 1.0
+        self.chunk_size = 5000
+        self.refresh_interval = 900
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app, detector=None):
+        self.app = app
+        self.detector = detector or self.detector or app.extensions.get('spam_detector')
+        self.max_ngram = app.config.get('PATTERN_MAX_NGRAM', 2)
+        self.top_k = app.config.get('PATTERN_TOP_K', 50)
+        self.min_support = app.config.get('PATTERN_MIN_SUPPORT', 5)
+        self.chunk_size = app.config.get('PATTERN_CHUNK_SIZE', 5000)
+        self.refresh_interval = app.config.get('PATTERN_REFRESH_INTERVAL', 900)
+        app.extensions['pattern_miner'] = self
+
+    def build_analyzer(self):
+        """The model's tokenization, extended to n-grams up to max_ngram"""
+        params = self.detector.analyzer_params()
+        params['ngram_range'] = (1, max(self.max_ngram, params['ngram_range'][1]))
+        return CountVectorizer(**params).build_analyzer()
+
+    def refresh(self, full=False):
+        """
+        Mine requests written since the last run and re-rank the patterns
+
+        Rows are mined chunk_size at a time. Each chunk's counts are added,
+        and last_id advanced past it, in one short transaction, so the
+        database write lock is never held for the length of the run. If
+        another worker claimed the same rows first, the chunk is rolled
+        back and this run stops, so no request is counted twice.
+
+        Args:
+            full (bool): Forget all counts and mine the whole history again
+
+        Returns:
+            dict: Rows mined, totals and whether the run was applied
+        """
+        analyzer = self.build_analyzer()
+        session = db.session
+        state_table = PatternMinerState.__table__
+
+        try:
+            # Create the state row if it is missing; adding zero leaves an
+            # existing one unchanged and is safe when workers race
+            increment_counters(session, PatternMinerState, 'id', [
+                {'id': 1, 'last_id': 0, 'spam_total': 0, 'ham_total': 0}
+            ])
+            if full:
+                session.execute(delete(PatternCount.__table__))
+                session.execute(
+                    update(state_table).where(state_table.c.id == 1)
+                    .values(last_id=0, spam_total=0, ham_total=0)
+                )
+            session.commit()
+
+            mined = 0
+            while True:
+                start_id, spam_total, ham_total = session.execute(
+                    select(PatternMinerState.last_id, PatternMinerState.spam_total, PatternMinerState.ham_total)
+                    .where(PatternMinerState.id == 1)
+                ).one()
+                rows = session.execute(
+                    select(RequestHistory.id, RequestHistory.text, RequestHistory.is_spam, RequestHistory.confidence)
+                    .where(RequestHistory.id > start_id)
+                    .order_by(RequestHistory.id)
+                    .limit(self.chunk_size)
+                ).all()
+                # End the read before counting; the claim below re-checks start_id
+                session.rollback()
+                if not rows:
+                    break
+
+                counts, spam, ham = self._count(analyzer, rows)
+                increment_counters(session, PatternCount, 'pattern', [
+                    {'pattern': pattern, 'spam_docs': spam_docs, 'ham_docs': ham_docs, 'spam_confidence': confidence}
+                    for pattern, (spam_docs, ham_docs, confidence) in counts.items()
+                ])
+                # Claim the chunk; fails if another run moved last_id meanwhile
+                claimed = session.execute(
+                    update(state_table)
+                    .where(state_table.c.id == 1, state_table.c.last_id == start_id)
+                    .values(last_id=rows[-1].id, spam_total=spam_total + spam, ham_total=ham_total + ham)
+                ).rowcount
+                if not claimed:
+                    session.rollback()
+                    return {'applied': False, 'mined': mined}
+                session.commit()
+                mined += len(rows)
+                if len(rows) < self.chunk_size:
+                    break
+
+            state = session.execute(
+                select(PatternMinerState.last_id, PatternMinerState.spam_total, PatternMinerState.ham_total)
+                .where(PatternMinerState.id == 1)
+            ).one()
+            self._rank(session, state.spam_total, state.ham_total)
+            session.execute(
+                update(state_table).where(state_table.c.id == 1).values(updated_at=datetime.utcnow())
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        return {
+            'applied': True,
+            'mined': mined,
+            'last_id': state.last_id,
+            'spam_total': state.spam_total,
+            'ham_total': state.ham_total
+        }
+
+    def _count(self, analyzer, rows):
+        """
+        Per-pattern document counts of one chunk of requests
+
+        Returns:
+            tuple: ({pattern: [spam_docs, ham_docs, spam_confidence]}, spam rows, ham rows)
+        """
+        counts = defaultdict(lambda: [0, 0, 0.0])
+        spam = ham = 0
+        for _, text, is_spam, confidence in rows:
+            for pattern in set(analyzer(text)):
+                if len(pattern) > MAX_PATTERN_LENGTH:
+                    continue
+                if is_spam:
+                    counts[pattern][0] += 1
+                    counts[pattern][2] += confidence
+                else:
+                    counts[pattern][1] += 1
+            if is_spam:
+                spam += 1
+            else:
+                ham += 1
+        return counts, spam, ham
+
+    def _rank(self, session, spam_total, ham_total):
+        """Replace spam_patterns with the top_k patterns by smoothed lift"""
+        session.execute(delete(SpamPattern.__table__))
+        if not spam_total:
+            return
+
+        # P(pattern | spam) / P(pattern | ham), with add-k smoothing on ham
+        s = self.smoothing
+        lift = (
+            (PatternCount.spam_docs * 1.0 / spam_total)
+            / ((PatternCount.ham_docs + s) / (ham_total + 2 * s))
+        ).label('lift')
+        top = session.execute(
+            select(PatternCount.pattern, PatternCount.spam_docs, PatternCount.ham_docs,
+                   PatternCount.spam_confidence, lift)
+            .where(PatternCount.spam_docs >= self.min_support)
+            .order_by(lift.desc(), PatternCount.spam_docs.desc(), PatternCount.pattern)
+            .limit(self.top_k)
+        ).all()
+
+        if top:
+            session.execute(insert(SpamPattern.__table__), [
+                {
+                    'rank': rank,
+                    'pattern': pattern,
+                    'spam_docs': spam,
+                    'ham_docs': ham,
+                    'lift': lift,
+                    'avg_confidence': confidence / spam
+                }
+                for rank, (pattern, spam, ham, confidence, lift) in enumerate(top, 1)
+            ])
+
+    def is_stale(self):
+        """True if the last run is older than refresh_interval"""
+        if not self.refresh_interval:
+            return False
+        state = db.session.get(PatternMinerState, 1)
+        if state is None or state.updated_at is None:
+            return True
+        return (datetime.utcnow() - state.updated_at).total_seconds() >= self.refresh_interval
+
+    def refresh_async(self, full=False):
+        """
+        Mine in a background thread unless a run is already going
+
+        Returns:
+            bool: True if a run was started
+        """
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._run, args=(full,), name='pattern-miner', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, full=False):
+        with self.app.app_context():
+            try:
+                self.refresh(full=full)
+            except Exception as e:
+                print(f"Pattern mining failed: {e}")
+
+    def top_patterns(self, limit=10):
+        """The precomputed top patterns, best first"""
+        return SpamPattern.query.order_by(SpamPattern.rank).limit(limit).all()
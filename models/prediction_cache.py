@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+def normalize_text(text):
+    """
+    Normalize text the same way the word TF-IDF vectorizer sees it
+
+    Case and runs of whitespace never change the extracted tokens, so texts
+    that differ only in those share a cache entry.
+    """
+    return ' '.join(text.lower().split())
+
+def make_key(text, model_version):
+    """Digest of the normalized text, scoped to one model version"""
+    data = f"{model_version}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+class PredictionCache:
+    """
+    Base class for prediction caches
+
+    Values are (is_spam, confidence, model_version) tuples keyed by the
+    digest from make_key(). Subclasses implement _get, _set and clear, and
+    override _get_many and _set_many when the backend can serve several
+    keys in one round trip; this class keeps the per-worker hit, miss and
+    eviction counters.
+    """
+
+    backend = None
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached (is_spam, confidence, model_version), or None"""
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Store an (is_spam, confidence, model_version) tuple"""
+        self._set(key, tuple(value))
+
+    def get_many(self, keys):
+        """Return the cached values of several keys, with None for each miss"""
+        values = self._get_many(keys) if keys else []
+        hits = sum(1 for value in values if value is not None)
+        with self._counter_lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def set_many(self, items):
+        """Store several (key, (is_spam, confidence, model_version)) pairs"""
+        if items:
+            self._set_many([(key, tuple(value)) for key, value in items])
+
+    def _count_evictions(self, count):
+        with self._counter_lock:
+            self.evictions += count
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def _get_many(self, keys):
+        return [self._get(key) for key in keys]
+
+    def _set_many(self, items):
+        for key, value in items:
+            self._set(key, value)
+
+    def clear(self):
+        """Drop every entry, e.g. after the model changed"""
+        raise NotImplementedError
+
+    def size(self):
+        """Number of stored entries, or None if the backend can't tell cheaply"""
+        return None
+
+    def stats(self):
+        """Counters for the admin stats"""
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'size': self.size(),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class MemoryCache(PredictionCache):
+    """Bounded in-process LRU cache; each worker has its own"""
+
+    backend = 'memory'
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        return self._get_many([key])[0]
+
+    def _get_many(self, keys):
+        values = []
+        expired = 0
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                elif entry[1] < now:
+                    del self._entries[key]
+                    expired += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        if expired:
+            self._count_evictions(expired)
+        return values
+
+    def _set(self, key, value):
+        self._set_many([(key, value)])
+
+    def _set_many(self, items):
+        if self.maxsize <= 0:
+            return
+
+        evicted = 0
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count_evictions(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def stats(self):
+        stats = super().stats()
+        stats['maxsize'] = self.maxsize
+        return stats
+
+class SQLiteCache(PredictionCache):
+    """
+    Cache stored in a SQLite file, shared by every worker on the host
+
+    Uses WAL mode so readers never block each other. The table is pruned
+    back to maxsize entries (oldest first) every prune_every writes.
+    """
+
+    backend = 'sqlite'
+
+    MAX_KEYS_PER_QUERY = 500
+
+    def __init__(self, path, maxsize=100000, ttl=3600, prune_every=1000):
+        super().__init__(ttl)
+        self.path = path
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+
+        # Create the schema with a throwaway connection so no connection is
+        # inherited by forked workers
+        connection = sqlite3.connect(path, timeout=5)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS predictions (
+                    key TEXT PRIMARY KEY,
+                    is_spam INTEGER NOT NULL,
+                    confidence REAL NOT NULL,
+                    model_version TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_predictions_expires_at ON predictions (expires_at)')
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connection(self):
+        """One connection per thread and process"""
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _get(self, key):
+        row = self._connection().execute(
+            'SELECT is_spam, confidence, model_version FROM predictions WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1], row[2]
+
+    def _get_many(self, keys):
+        connection = self._connection()
+        now = time.time()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), self.MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + self.MAX_KEYS_PER_QUERY]
+            rows = connection.execute(
+                f"SELECT key, is_spam, confidence, model_version FROM predictions "
+                f"WHERE key IN ({', '.join('?' * len(chunk))}) AND expires_at > ?",
+                (*chunk, now)
+            )
+            for key, is_spam, confidence, model_version in rows:
+                found[key] = (bool(is_spam), confidence, model_version)
+        return [found.get(key) for key in keys]
+
+    def _set(self, key, value):
+        self._set_many([(key, value)])
+
+    def _set_many(self, items):
+        connection = self._connection()
+        expires_at = time.time() + self.ttl
+        # One transaction, so a batch costs one commit
+        connection.execute('BEGIN')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO predictions (key, is_spam, confidence, model_version, expires_at) VALUES (?, ?, ?, ?, ?)',
+                [(key, int(is_spam), confidence, model_version, expires_at)
+                 for key, (is_spam, confidence, model_version) in items]
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        previous = self._writes
+        self._writes += len(items)
+        if self._writes // self.prune_every != previous // self.prune_every:
+            self._prune(connection)
+
+    def _prune(self, connection):
+        """Drop expired entries, then the oldest ones beyond maxsize"""
+        expired = connection.execute('DELETE FROM predictions WHERE expires_at <= ?', (time.time(),)).rowcount
+        excess = connection.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] - self.maxsize
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY expires_at LIMIT ?)',
+                (excess,)
+            )
+        self._count_evictions(expired + max(excess, 0))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM predictions')
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+
+    def stats(self):
+        stats = super().stats()
+        stats['maxsize'] = self.maxsize
+        return stats
+
+class RedisCache(PredictionCache):
+    """
+    Cache stored in a Redis-compatible server, shared across hosts
+
+    Pass a ready client (anything with redis-py's get, set, mget, pipeline,
+    scan_iter and delete, such as a local stand-in in tests) or a URL, in which case the
+    optional redis package is required. Entries expire server-side.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, url=None, client=None, ttl=3600, prefix='spam-shield:prediction:'):
+        super().__init__(ttl)
+        self.prefix = prefix
+
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("The redis cache backend needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def _get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        is_spam, confidence, model_version = json.loads(raw)
+        return bool(is_spam), confidence, model_version
+
+    def _set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(list(value)), ex=self.ttl)
+
+    def _get_many(self, keys):
+        values = []
+        for raw in self.client.mget([self.prefix + key for key in keys]):
+            if raw is None:
+                values.append(None)
+            else:
+                is_spam, confidence, model_version = json.loads(raw)
+                values.append((bool(is_spam), confidence, model_version))
+        return values
+
+    def _set_many(self, items):
+        # MSET can't set expiries; a non-transactional pipeline is still one round trip
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipeline.set(self.prefix + key, json.dumps(list(value)), ex=self.ttl)
+        pipeline.execute()
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+def create_cache(config, instance_path=None):
+    """
+    Build the prediction cache selected by PREDICTION_CACHE_BACKEND
+
+    Args:
+        config (dict): Application config
+        instance_path (str): Default directory for the SQLite cache file
+
+    Returns:
+        PredictionCache: The configured cache
+    """
+    backend = config.get('PREDICTION_CACHE_BACKEND', 'memory')
+    size = config.get('PREDICTION_CACHE_SIZE', 10000)
+    ttl = config.get('PREDICTION_CACHE_TTL', 3600)
+
+    if backend == 'memory':
+        return MemoryCache(maxsize=size, ttl=ttl)
+
+    if backend == 'sqlite':
+        path = config.get('PREDICTION_CACHE_PATH')
+        if not path:
+            os.makedirs(instance_path, exist_ok=True)
+            path = os.path.join(instance_path, 'prediction_cache.db')
+        return SQLiteCache(path, maxsize=size, ttl=ttl)
+
+    if backend == 'redis':
+        return RedisCache(url=config.get('PREDICTION_CACHE_URL'), ttl=ttl)
+
+    raise ValueError(f"Unknown prediction cache backend: {backend}")
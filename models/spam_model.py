@@ -1,15 +1,42 @@
 import os
+import time
 import pickle
+import threading
+from contextlib import contextmanager
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
+from .compact_model import CompactModel, export_compact, ANALYZER_PARAMS
+from .inference_engine import InferenceEngine
+from .prediction_cache import MemoryCache, create_cache, make_key
+from .model_registry import ModelRegistry
+from monitoring import metrics
 import random
 
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to the in-process lock only
+    fcntl = None
+
 class SpamDetector:
     def __init__(self):
-        self.model = None
+        # The live (model, version) pair, swapped as one reference
+        self._live = (None, None)
+        # Bundled artifacts that seed an empty registry
         self.model_path = os.path.join(os.path.dirname(__file__), 'spam_classifier.pkl')
+        self.compact_path = os.path.join(os.path.dirname(__file__), 'spam_classifier.compact')
+        self.registry_path = os.path.join(os.path.dirname(__file__), 'registry')
+        self.registry_keep = 5
+        self.registry = None
+        self.model_format = 'pickle'
+        self.cache = MemoryCache()
+        self.check_interval = 5
+        self._current_stat = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+        # Optional process pool that scores in other cores, see InferencePool
+        self.inference_pool = None
         
         # Initialize example messages
         self.spam_examples = [
@@ -38,59 +65,361 @@ class SpamDetector:
             "Happy birthday! Wishing you all the best on your special day."
         ]
     
+    def init_app(self, app):
+        """
+        Load the model when the app starts instead of on the first request
+        
+        Runs once per process. When gunicorn preloads the app in the master,
+        forked workers share the loaded model pages copy-on-write.
+        
+        Args:
+            app (Flask): The application whose config controls loading
+        """
+        app.extensions['spam_detector'] = self
+        self.model_format = app.config.get('MODEL_FORMAT', 'pickle')
+        self.check_interval = app.config.get('MODEL_CHECK_INTERVAL', 5)
+        self.registry_path = app.config.get('MODEL_REGISTRY_PATH') or self.registry_path
+        self.registry_keep = app.config.get('MODEL_REGISTRY_KEEP', 5)
+        self.cache = create_cache(app.config, app.instance_path)
+        
+        if app.config.get('MODEL_EAGER_LOAD', True):
+            self.ensure_loaded()
+            self.warm_up(app.config.get('MODEL_WARMUP_ROUNDS', 3))
+    
+    @property
+    def model(self):
+        return self._live[0]
+    
+    @property
+    def model_version(self):
+        return self._live[1]
+    
+    def ensure_loaded(self):
+        """Load the model exactly once, even when several threads ask for it"""
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self.load_model()
+        return self.model
+    
+    def warm_up(self, rounds=3):
+        """
+        Run a few throwaway predictions so the first real request is not slower
+        
+        Args:
+            rounds (int): Number of passes over the example messages
+        """
+        examples = self.spam_examples + self.ham_examples
+        for _ in range(rounds):
+            # Go straight to the model so warm-up neither fills the cache
+            # nor skews its hit rate
+            for text in examples:
+                self._score([text])
+            self._score(examples)
+    
+    @contextmanager
+    def _artifact_lock(self):
+        """Serialize loading and training across worker processes"""
+        if fcntl is None:
+            yield
+            return
+        
+        os.makedirs(self.registry_path, exist_ok=True)
+        with open(os.path.join(self.registry_path, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def get_registry(self):
+        if self.registry is None or self.registry.path != self.registry_path:
+            self.registry = ModelRegistry(self.registry_path, keep=self.registry_keep)
+        return self.registry
+    
     def load_model(self):
-        """Load the pre-trained model or train a new one if it doesn't exist"""
-        if os.path.exists(self.model_path):
-            with open(self.model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            print("Model loaded successfully")
-        else:
-            print("No pre-trained model found. Training a new model...")
-            self.train_model()
+        """Load the live registry version, seeding the registry if it is empty"""
+        with self._artifact_lock():
+            registry = self.get_registry()
+            version = registry.current()
+            if version is None:
+                if os.path.exists(self.model_path):
+                    print("Importing the bundled model into the registry...")
+                    version = registry.import_files(self.model_path, self.compact_path)
+                else:
+                    print("No pre-trained model found. Training a new model...")
+                    version = registry.publish(self.fit_base_pipeline())
+            
+            model = self.open_version(version)
+            label = {'compact': 'Compact model', 'engine': 'Compiled model'}.get(self.model_format, 'Model')
+            print(f"{label} {version} loaded successfully")
+            
+            # One assignment, so a request sees either the old or the new
+            # model with its matching version, never a mix
+            self._live = (model, version)
+            self._current_stat = _stat_key(registry.current_path)
+    
+    def open_version(self, version):
+        """
+        Load one registry version in the configured model format
+        
+        Args:
+            version (str): A published version name
+            
+        Returns:
+            The CompactModel, InferenceEngine or fitted Pipeline, not yet made live
+        """
+        pickle_path, compact_path = self.get_registry().paths(version)
+        if self.model_format == 'compact':
+            # Memory-mapped and safe to load: no unpickling involved
+            return CompactModel(compact_path)
+        if self.model_format == 'engine':
+            # Compiled from the compact artifact into per-process lists
+            compact = CompactModel(compact_path)
+            try:
+                return InferenceEngine.from_compact(compact)
+            except ValueError as e:
+                print(f"Cannot compile model {version} for the inference engine, using the compact model: {e}")
+                return compact
+        with open(pickle_path, 'rb') as f:
+            return pickle.load(f)
+    
+    def check_for_update(self):
+        """
+        Reload the model if another process activated a different version
+        
+        The registry's CURRENT pointer is checked at most once every
+        check_interval seconds. After a reload the prediction cache is
+        cleared; the new model version also keeps any stale keys from
+        matching.
+        
+        Returns:
+            bool: True if the model was reloaded
+        """
+        now = time.monotonic()
+        if self.registry is None or now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        
+        if _stat_key(self.registry.current_path) == self._current_stat:
+            return False
+        
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if _stat_key(self.registry.current_path) == self._current_stat:
+                return False
+            
+            print("Model version changed in the registry. Reloading...")
+            self.load_model()
+            if self.cache is not None:
+                self.cache.clear()
+        return True
+    
+    def export_compact(self, path):
+        """
+        Write the live version's pipeline as a memory-mappable compact artifact
+        
+        Args:
+            path (str): Destination file
+        """
+        export_compact(self.load_pipeline(), path)
+        print("Compact model exported successfully")
     
     def train_model(self):
-        """Train a simple spam detection model"""
+        """Train a simple spam detection model and make it the live version"""
+        with self._artifact_lock():
+            version = self.publish_pipeline(self.fit_base_pipeline())
+        print(f"Model trained and saved as version {version}")
+        self.reload()
+    
+    def fit_base_pipeline(self):
+        """Fit a new pipeline on the built-in example messages"""
         # Create training data
         X_train = self.spam_examples + self.ham_examples
         y_train = [1] * len(self.spam_examples) + [0] * len(self.ham_examples)
         
         # Create and train the model
-        self.model = Pipeline([
+        model = Pipeline([
             ('vectorizer', TfidfVectorizer(lowercase=True, stop_words='english')),
             ('classifier', MultinomialNB())
         ])
         
-        self.model.fit(X_train, y_train)
+        model.fit(X_train, y_train)
+        return model
+    
+    def load_pipeline(self):
+        """
+        Load the live version's fitted sklearn pipeline, e.g. to update it
+        
+        Returns:
+            Pipeline: The pickled pipeline, or a freshly fitted one if there is none
+        """
+        registry = self.get_registry()
+        version = registry.current()
+        if version is None:
+            return self.fit_base_pipeline()
+        with open(registry.paths(version)[0], 'rb') as f:
+            return pickle.load(f)
+    
+    def publish_pipeline(self, model):
+        """
+        Store a fitted pipeline as a new registry version and activate it
         
-        # Save the model
-        with open(self.model_path, 'wb') as f:
-            pickle.dump(self.model, f)
+        The version is written to a temporary directory and renamed into
+        place, and the live pointer is replaced atomically, so other
+        processes never see a partially written artifact. Callers that may
+        race with other processes should hold _artifact_lock().
         
-        print("Model trained and saved successfully")
+        Args:
+            model (Pipeline): The fitted pipeline
+            
+        Returns:
+            str: The new version name
+        """
+        return self.get_registry().publish(model)
     
-    def predict(self, text):
+    def activate(self, version):
+        """
+        Make an existing registry version live, e.g. to roll back
+        
+        Raises:
+            ValueError: If the version does not exist
+        """
+        with self._artifact_lock():
+            self.get_registry().activate(version)
+        self.reload()
+    
+    def reload(self):
+        """Load the live registry version and swap it in for the current model"""
+        with self._lock:
+            self.load_model()
+            if self.cache is not None:
+                self.cache.clear()
+    
+    def predict(self, text, return_version=False):
         """
         Predict if a text is spam or not
         
         Args:
             text (str): The text to classify
+            return_version (bool): Also return the model version that scored it
             
         Returns:
             tuple: (is_spam, confidence)
                 is_spam (bool): True if spam, False if not
                 confidence (float): Prediction confidence (0-1)
+            With return_version, ((is_spam, confidence), model_version)
         """
-        if self.model is None:
-            self.load_model()
+        # Tokenize and transform once; the label and its confidence both
+        # come from the same probability row
+        results, model_version = self.predict_batch([text], return_version=True)
+        if return_version:
+            return results[0], model_version
+        return results[0]
+    
+    def predict_batch(self, texts, return_version=False):
+        """
+        Predict if each of several texts is spam or not
         
-        # Make prediction
-        prediction = self.model.predict([text])[0]
-        probabilities = self.model.predict_proba([text])[0]
+        All texts are vectorized and scored in a single pipeline call, which
+        is much cheaper than calling predict() once per text.
         
-        # Get confidence score
-        confidence = probabilities[1] if prediction == 1 else probabilities[0]
+        Args:
+            texts (list): The texts to classify
+            return_version (bool): Also return the model version that scored them
+            
+        Returns:
+            list: (is_spam, confidence) tuples in the same order as texts
+            With return_version, (results, model_version)
+        """
+        self.ensure_loaded()
+        self.check_for_update()
+        
+        # Take the model and its version together; a reload in another
+        # thread swaps both at once and doesn't affect this call
+        model, model_version = self._live
+        
+        if not texts:
+            return ([], model_version) if return_version else []
+        
+        if self.cache is None:
+            # Caching turned off: no keys to compute or store
+            results = self._score_dispatched(texts, model, model_version)
+            return (results, model_version) if return_version else results
+        
+        # Serve repeated texts from the cache, which may be shared with
+        # other workers
+        with metrics.stage('cache_lookup'):
+            keys = [make_key(text, model_version) for text in texts]
+            results = []
+            missing = []
+            # One round trip for the whole batch on shared backends
+            for i, cached in enumerate(self.cache.get_many(keys)):
+                if cached is not None and cached[2] == model_version:
+                    results.append(cached[:2])
+                else:
+                    results.append(None)
+                    missing.append(i)
+        
+        if missing:
+            scored = self._score_dispatched([texts[i] for i in missing], model, model_version)
+            for i, result in zip(missing, scored):
+                results[i] = result
+            with metrics.stage('cache_store'):
+                self.cache.set_many([(keys[i], result + (model_version,)) for i, result in zip(missing, scored)])
+        
+        if return_version:
+            return results, model_version
+        return results
+    
+    def _score_dispatched(self, texts, model, model_version):
+        """Score in the inference pool if there is one, else in this thread"""
+        pool = self.inference_pool
+        if pool is not None and pool.enabled:
+            try:
+                with metrics.stage('inference_pool'):
+                    return pool.score(texts, model_version)
+            except Exception as e:
+                # A crashed or stuck pool must not fail the request
+                print(f"Inference pool failed, scoring in-process: {e}")
+        return self._score(texts, model)
+    
+    def _score(self, texts, model=None):
+        """Score texts as one sparse matrix, bypassing the cache"""
+        model = model or self.model
+        # Same arithmetic as model.predict_proba, in two timed steps
+        if hasattr(model, 'predict_proba_features'):
+            vectorize, classify = model.transform, model.predict_proba_features
+        else:
+            vectorize = model.named_steps['vectorizer'].transform
+            classify = model.named_steps['classifier'].predict_proba
+        with metrics.stage('vectorize'):
+            features = vectorize(texts)
+        with metrics.stage('classify'):
+            probabilities = classify(features)
+        best = probabilities.argmax(axis=1)
+        labels = model.classes_[best]
+        confidences = probabilities[np.arange(len(best)), best]
         
-        return prediction == 1, confidence
+        return [
+            (bool(label == 1), float(confidence))
+            for label, confidence in zip(labels, confidences)
+        ]
+    
+    def analyzer_params(self):
+        """
+        Tokenization settings of the loaded vectorizer
+        
+        Returns:
+            dict: Keyword arguments for a CountVectorizer that splits text
+                into the same terms the model sees
+        """
+        model = self.ensure_loaded()
+        if hasattr(model, 'params'):
+            params = model.params
+        else:
+            params = model.named_steps['vectorizer'].get_params()
+        return {name: params[name] for name in ANALYZER_PARAMS}
     
     def get_example(self, is_spam=True):
         """
@@ -102,8 +431,15 @@ class SpamDetector:
         Returns:
             str: An example text
         """
-        if self.model is None:
-            self.load_model()
+        self.ensure_loaded()
         
         # Return a random example from the appropriate list
-        return random.choice(self.spam_examples) if is_spam else random.choice(self.ham_examples) 
\ No newline at end of file
+        return random.choice(self.spam_examples) if is_spam else random.choice(self.ham_examples) 
+
+def _stat_key(path):
+    """Identity of a file's current contents, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,2 @@
+from .metrics import metrics, Metrics, Histogram, Counter
+from .profiler import RequestProfiler
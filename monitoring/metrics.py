@@ -0,0 +1,258 @@
+import time
+import threading
+from bisect import bisect_left
+from flask import g, request, Response
+
+# Latency buckets in seconds, from 50us (a cache hit) to 2.5s (a slow commit)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+class _HistogramSeries:
+    """Bucket counts, sum and count of one label combination"""
+
+    __slots__ = ('counts', 'sum', 'count', 'lock')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with labels
+
+    observe() costs a bisect and an uncontended lock, so it is cheap enough
+    for every request. Counts are kept per bucket and only made cumulative
+    when rendered.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(labelvalues, _HistogramSeries(len(self.buckets) + 1))
+        return series
+
+    def observe(self, value, *labelvalues):
+        """Record one value (in seconds) for the given label values"""
+        series = self._get(labelvalues)
+        index = bisect_left(self.buckets, value)
+        with series.lock:
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def time(self, *labelvalues):
+        """Context manager that observes the time spent in its block"""
+        return _Timer(self, labelvalues)
+
+    def samples(self):
+        for labelvalues, series in sorted(self._series.items()):
+            with series.lock:
+                counts, total, count = list(series.counts), series.sum, series.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield '_bucket', _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"'), cumulative
+            yield '_sum', _labels(self.labelnames, labelvalues), total
+            yield '_count', _labels(self.labelnames, labelvalues), count
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            yield '', _labels(self.labelnames, labelvalues), value
+
+class Collected:
+    """
+    Metric read from the application when /metrics is scraped
+
+    The callback returns a number, or a list of (label values, number)
+    pairs; use it for values other components already keep, such as cache
+    counters or the database pool size.
+    """
+
+    def __init__(self, name, documentation, callback, type='gauge', labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.type = type
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        values = self.callback()
+        if values is None:
+            return
+        if not isinstance(values, (list, tuple)):
+            values = [((), values)]
+        for labelvalues, value in values:
+            if value is not None:
+                yield '', _labels(self.labelnames, labelvalues), value
+
+class _Timer:
+    __slots__ = ('histogram', 'labelvalues', 'start')
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+class Metrics:
+    """
+    Per-process metrics registry with a Prometheus text exposition endpoint
+
+    Each gunicorn worker keeps its own values; scrape every worker (or
+    add the worker as a label in the scraper) to see the whole server.
+    """
+
+    def __init__(self, prefix='spamshield'):
+        self.prefix = prefix
+        self.app = None
+        self.enabled = False
+        self._metrics = {}
+        self.stage_seconds = self.histogram(
+            'stage_seconds', 'Time spent in each stage of the spam check hot path', ['stage']
+        )
+        self.http_requests = self.counter(
+            'http_requests_total', 'HTTP requests handled', ['endpoint', 'method', 'status']
+        )
+        self.http_request_seconds = self.histogram(
+            'http_request_duration_seconds', 'HTTP request latency', ['endpoint']
+        )
+
+    def _add(self, metric):
+        metric.name = f"{self.prefix}_{metric.name}"
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def collect(self, name, documentation, callback, type='gauge', labelnames=()):
+        """Register a metric whose value is read at scrape time"""
+        return self._add(Collected(name, documentation, callback, type, labelnames))
+
+    def stage(self, name):
+        """
+        Time one stage of the hot path
+
+        Usage:
+            with metrics.stage('guest_limit'):
+                ...
+        """
+        return _Timer(self.stage_seconds, (name,))
+
+    def init_app(self, app):
+        """
+        Time every request and serve /metrics when METRICS_ENABLED
+
+        Args:
+            app (Flask): The application to instrument
+        """
+        self.app = app
+        app.extensions['metrics'] = self
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self.metrics_view)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+
+    def _after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            # The URL rule rather than the path keeps the label set bounded
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            self.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - start)
+        return response
+
+    def observe_request(self, endpoint, method, status, seconds):
+        """
+        Record one handled request
+
+        Called by the Flask hooks, and by servers that answer requests
+        without going through Flask (see asgi.AsyncFront).
+        """
+        self.http_request_seconds.observe(seconds, endpoint)
+        self.http_requests.inc(endpoint, method, str(status))
+
+    def metrics_view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in self._metrics.items():
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # One broken collector must not take the endpoint down
+                print(f"Failed to collect {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{labels} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
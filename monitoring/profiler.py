@@ -0,0 +1,166 @@
+import io
+import time
+import heapq
+import pstats
+import random
+import cProfile
+import itertools
+import threading
+from datetime import datetime
+from flask import g, request
+
+class RequestProfiler:
+    """
+    Profile a sample of requests with cProfile and keep the slowest traces
+
+    A request is profiled with probability PROFILE_SAMPLE_RATE, or always
+    when an admin sends the PROFILE_HEADER header (e.g. X-Profile: 1). The
+    profile covers the view function; a streamed body is produced after the
+    trace is closed. A request that raises past the error handlers is closed
+    in teardown_request instead, so the profiler never stays enabled on the
+    worker thread. Only the PROFILE_KEEP slowest traces are kept, so the
+    buffer stays the same size however long the worker runs, and each
+    profiled response carries an X-Profile-Id header to look its trace up.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.sample_rate = 0.0
+        self.header = 'X-Profile'
+        self.keep = 20
+        self.top_functions = 30
+        self.profiled = 0
+        self._traces = []  # min-heap of (duration, id, trace)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, is_admin=None):
+        """
+        Args:
+            app (Flask): The application to profile
+            is_admin (callable): Returns True if the current request comes
+                from an admin; required for the forcing header to work
+        """
+        self.app = app
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.header = app.config.get('PROFILE_HEADER', 'X-Profile')
+        self.keep = app.config.get('PROFILE_KEEP', 20)
+        self.top_functions = app.config.get('PROFILE_TOP_FUNCTIONS', 30)
+        self.is_admin = is_admin or (lambda: False)
+        app.extensions['request_profiler'] = self
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _wants_profile(self):
+        if request.path.startswith('/debug/profiles'):
+            return False, False
+        if request.headers.get(self.header):
+            # Only admins may force a profile; the header is ignored otherwise
+            return self.is_admin(), True
+        return self.sample_rate > 0 and random.random() < self.sample_rate, False
+
+    def _before_request(self):
+        selected, forced = self._wants_profile()
+        if not selected:
+            return
+        profile = cProfile.Profile()
+        g._profile = (profile, forced, time.perf_counter())
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            g.pop('_profile')
+
+    def _after_request(self, response):
+        state = g.pop('_profile', None)
+        if state is None:
+            return response
+
+        profile, forced, start = state
+        profile.disable()
+        duration = time.perf_counter() - start
+        trace_id = self._store(profile, duration, forced, response.status_code)
+        if trace_id is not None:
+            response.headers['X-Profile-Id'] = str(trace_id)
+        return response
+
+    def _teardown_request(self, exc):
+        # Still set only if after_request never ran, e.g. the view raised
+        # with PROPAGATE_EXCEPTIONS or another after_request hook failed
+        state = g.pop('_profile', None)
+        if state is None:
+            return
+
+        profile, forced, start = state
+        profile.disable()
+        self._store(profile, time.perf_counter() - start, forced, 500)
+
+    def _store(self, profile, duration, forced, status):
+        trace_id = next(self._ids)
+        with self._lock:
+            self.profiled += 1
+            # Not among the slowest: skip summarizing it at all
+            if len(self._traces) >= self.keep and duration <= self._traces[0][0]:
+                return None
+
+        trace = {
+            'id': trace_id,
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.url_rule.rule if request.url_rule else None,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'forced': forced,
+            'timestamp': datetime.utcnow().isoformat(),
+            'functions': self._top_functions(profile),
+            'text': self._text(profile)
+        }
+        with self._lock:
+            heapq.heappush(self._traces, (duration, trace_id, trace))
+            while len(self._traces) > self.keep:
+                heapq.heappop(self._traces)
+        return trace_id
+
+    def _top_functions(self, profile):
+        """The functions with the most cumulative time, as plain dicts"""
+        stats = pstats.Stats(profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_functions]
+        return [
+            {
+                'function': name,
+                'file': filename,
+                'line': line,
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            }
+            for (filename, line, name), (_, calls, total, cumulative, _) in rows
+        ]
+
+    def _text(self, profile):
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(self.top_functions)
+        return stream.getvalue()
+
+    def traces(self):
+        """Kept traces without their function tables, slowest first"""
+        with self._lock:
+            traces = [trace for _, _, trace in sorted(self._traces, reverse=True)]
+        return [
+            {key: value for key, value in trace.items() if key not in ('functions', 'text')}
+            for trace in traces
+        ]
+
+    def get(self, trace_id):
+        """One kept trace, or None if it was never kept or has been pushed out"""
+        with self._lock:
+            for _, kept_id, trace in self._traces:
+                if kept_id == trace_id:
+                    return trace
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._traces = []
@@ -13,6 +13,7 @@ ROUTE_ABOUT = '/about'
 ROUTE_PROFILE = '/profile'
 # API routes
 API_CHECK_SPAM = '/api/check-spam'
+API_CHECK_SPAM_BATCH = '/api/check-spam/batch'
 API_HISTORY = '/api/history'
 API_EXAMPLE_SPAM = '/api/example/spam'
 API_EXAMPLE_HAM = '/api/example/ham'
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import db
+from database.rollups import rebuild_rollups
+
+ADMIN_ID = 1
+
+SPAM_WORDS = ['free', 'winner', 'prize', 'urgent', 'verify', 'account', 'click', 'offer', 'cash', 'bank']
+HAM_WORDS = ['meeting', 'notes', 'dinner', 'project', 'thanks', 'tomorrow', 'report', 'flight', 'family', 'call']
+
+def synthetic_text(rng, is_spam):
+    words = SPAM_WORDS if is_spam else HAM_WORDS
+    return ' '.join(rng.choice(words) for _ in range(rng.randint(5, 30)))
+
+def build_database(path, rows, users, seed=0):
+    """
+    Create the full schema and fill it with synthetic users and requests
+
+    User 1 is an admin. Requests are spread over the last 90 days, and the
+    stats rollups are rebuilt from them as the app would have kept them.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=OFF')
+    connection.execute('PRAGMA synchronous=OFF')
+
+    created = datetime(2025, 1, 1).strftime('%Y-%m-%d %H:%M:%S.%f')
+    connection.executemany(
+        'INSERT INTO users (id, username, email, password_hash, created_at, is_active, is_admin) VALUES (?, ?, ?, ?, ?, 1, ?)',
+        ((i, f"user{i}", f"user{i}@example.com", 'x', created, i == ADMIN_ID) for i in range(1, users + 1))
+    )
+
+    end = datetime.utcnow()
+    start = end - timedelta(days=90)
+    step = (end - start) / max(rows, 1)
+    chunk = 100000
+    for offset in range(0, rows, chunk):
+        batch = []
+        for i in range(offset, min(offset + chunk, rows)):
+            is_spam = rng.random() < 0.3
+            batch.append((
+                rng.randint(1, users),
+                synthetic_text(rng, is_spam),
+                is_spam,
+                rng.uniform(0.5, 1.0),
+                (start + step * i).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                'benchmark'
+            ))
+        connection.executemany(
+            'INSERT INTO request_history (user_id, text, is_spam, confidence, timestamp, model_version) VALUES (?, ?, ?, ?, ?, ?)',
+            batch
+        )
+        connection.commit()
+        print(f"  {min(offset + chunk, rows):,} / {rows:,} rows", end='\r', flush=True)
+    print()
+    connection.execute('ANALYZE')
+    connection.commit()
+    connection.close()
+
+    with engine.begin() as connection:
+        rebuild_rollups(connection)
+    engine.dispose()
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of already sorted values"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize(latencies, elapsed, errors):
+    """Throughput and latency percentiles of one scenario, in requests/s and ms"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3)
+    }
+
+def run_scenario(call, count, warmup):
+    """
+    Time count calls after warmup untimed ones
+
+    Each call sends one request and reads the whole response body, so
+    streamed responses are timed to their last byte.
+    """
+    for i in range(warmup):
+        call(i)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for i in range(warmup, warmup + count):
+        call_start = time.perf_counter()
+        response = call(i)
+        response.get_data()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+def build_scenarios(app, client, args):
+    """
+    The benchmarked requests, as {name: (call, share of --requests)}
+
+    Texts are unique per call so single and batch checks measure the model
+    rather than the prediction cache.
+    """
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        user_tokens = [
+            {'Authorization': f"Bearer {create_access_token(identity=user_id)}"}
+            for user_id in range(2, args.users + 1)
+        ]
+        admin = {'Authorization': f"Bearer {create_access_token(identity=ADMIN_ID)}"}
+
+    rng = random.Random(1)
+    today = datetime.utcnow().date()
+    week_ago = (today - timedelta(days=7)).isoformat()
+
+    def check(i):
+        return client.post('/api/check-spam', json={'text': f"{synthetic_text(rng, i % 3 == 0)} {i}"},
+                           headers=rng.choice(user_tokens))
+
+    def check_batch(i):
+        texts = [f"{synthetic_text(rng, j % 3 == 0)} {i}.{j}" for j in range(args.batch_size)]
+        return client.post('/api/check-spam/batch', json={'texts': texts}, headers=rng.choice(user_tokens))
+
+    def guest_check(i):
+        # A new address per call, so every guest stays within its limit
+        ip = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+        return client.post('/api/check-spam', json={'text': f"{synthetic_text(rng, False)} {i}"},
+                           headers={'X-Forwarded-For': ip})
+
+    # Page up to five deep through one user's history, then switch user
+    paging = {'headers': None, 'cursor': None, 'depth': 0}
+    def history_page(i):
+        if paging['cursor'] is None or paging['depth'] >= 5:
+            paging.update(headers=rng.choice(user_tokens), cursor=None, depth=0)
+        query = {'limit': 50}
+        if paging['cursor']:
+            query['cursor'] = paging['cursor']
+        response = client.get('/api/history', query_string=query, headers=paging['headers'])
+        paging['cursor'] = (response.get_json() or {}).get('next_cursor')
+        paging['depth'] += 1
+        return response
+
+    def admin_requests(i):
+        query = {'per_page': 10, 'result': 'spam' if i % 2 else '', 'date_from': week_ago}
+        return client.get('/api/admin/requests', query_string=query, headers=admin)
+
+    def admin_stats(i):
+        return client.get('/api/admin/stats', headers=admin)
+
+    def export_csv(i):
+        return client.get('/api/admin/requests/export', headers=admin)
+
+    return {
+        'check_spam': (check, 1),
+        'check_spam_batch': (check_batch, 0.2),
+        'guest_check_spam': (guest_check, 1),
+        'history_page': (history_page, 1),
+        'admin_requests': (admin_requests, 0.5),
+        'admin_stats': (admin_stats, 0.2),
+        'export_csv': (export_csv, 0.01)
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(results, baseline_path):
+    """Print the change of each scenario against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} ({baseline['meta'].get('git_revision') or 'unknown revision'}):")
+    print(f"{'scenario':<20}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>10}")
+    for name, current in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        changes = [
+            f"{(current[key] - previous[key]) / previous[key] * 100:+.1f}%" if previous[key] else 'n/a'
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+        ]
+        print(f"{name:<20}" + ''.join(f"{change:>10}" for change in changes))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths offline with the Flask test client')
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic request history rows')
+    parser.add_argument('--users', type=int, default=200, help='Synthetic users (user 1 is the admin)')
+    parser.add_argument('--requests', type=int, default=500, help='Timed requests per scenario; slower scenarios run a share of this')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests before each scenario')
+    parser.add_argument('--batch-size', type=int, default=20, help='Texts per batch check')
+    parser.add_argument('--scenarios', nargs='+', help='Only run these scenarios')
+    parser.add_argument('--path', default='benchmark_api.db', help='Scratch SQLite file (overwritten)')
+    parser.add_argument('--reuse-db', action='store_true', help='Keep an existing scratch database instead of rebuilding it')
+    parser.add_argument('-o', '--output', default='benchmark_api.json', help='JSON results file')
+    parser.add_argument('--compare', help='Earlier JSON results to compare against')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    if not (args.reuse_db and os.path.exists(path)):
+        print(f"Building {args.rows:,} rows in {path}")
+        build_database(path, args.rows, args.users)
+
+    # Configure the app before it is imported
+    os.environ['DATABASE_URI'] = f"sqlite:///{path}"
+    os.environ.setdefault('PATTERN_REFRESH_INTERVAL', '0')
+    os.environ.setdefault('ONLINE_TRAINING', 'false')
+    from app import app
+
+    client = app.test_client()
+    scenarios = build_scenarios(app, client, args)
+    selected = args.scenarios or list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(scenarios)})")
+
+    results = {}
+    print(f"\n{'scenario':<20}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in selected:
+        call, share = scenarios[name]
+        count = max(3, int(args.requests * share))
+        result = run_scenario(call, count, min(args.warmup, count))
+        results[name] = result
+        print(f"{name:<20}{result['requests']:>9}{result['errors']:>8}{result['throughput_rps']:>10.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+    output = {
+        'meta': {
+            'git_revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': args.rows,
+            'users': args.users,
+            'batch_size': args.batch_size,
+            'model_format': app.config['MODEL_FORMAT'],
+            'prediction_cache': app.config['PREDICTION_CACHE_BACKEND'],
+            'history_write_behind': app.config['HISTORY_WRITE_BEHIND']
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == '__main__':
+    main()
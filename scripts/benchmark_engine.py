@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import pickle
+import random
+import argparse
+import statistics
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.spam_model import SpamDetector
+from models.compact_model import CompactModel
+from models.inference_engine import InferenceEngine
+
+def build_texts(detector, vocabulary, count, seed=0):
+    """Short and long sample texts: the detector's examples plus random vocabulary terms"""
+    rng = random.Random(seed)
+    examples = detector.spam_examples + detector.ham_examples
+    terms = list(vocabulary) + ['unseenterm']
+    return {
+        'short': examples + [' '.join(rng.choice(terms) for _ in range(rng.randint(3, 30))) for _ in range(count)],
+        'long': [' '.join(examples[i:] + examples[:i]) * 5 for i in range(len(examples))]
+                + [' '.join(rng.choice(terms) for _ in range(rng.randint(300, 1500))) for _ in range(count // 10)]
+    }
+
+def check_exact(models, reference, texts):
+    """Fail unless every model returns exactly the reference probabilities"""
+    expected = reference.predict_proba(texts)
+    for name, model in models.items():
+        probabilities = model.predict_proba(texts)
+        mismatches = int((probabilities != expected).any(axis=1).sum())
+        assert mismatches == 0, f"{name}: {mismatches} of {len(texts)} texts differ from the pipeline"
+
+def time_per_message(model, texts, iterations):
+    """Return per-message predict_proba latencies in microseconds"""
+    latencies = []
+    for _ in range(iterations):
+        for text in texts:
+            start = time.perf_counter()
+            model.predict_proba([text])
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compiled inference engine against the sklearn pipeline')
+    parser.add_argument('--iterations', type=int, default=5, help='Passes over each sample set')
+    parser.add_argument('--texts', type=int, default=500, help='Random short texts (a tenth as many long ones)')
+    args = parser.parse_args()
+
+    detector = SpamDetector()
+    with open(detector.model_path, 'rb') as f:
+        pipeline = pickle.load(f)
+    compact = CompactModel(detector.compact_path)
+
+    start = time.perf_counter()
+    engine = InferenceEngine.from_compact(compact)
+    print(f"Compiled {engine.n_features:,} features in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    models = {'pipeline': pipeline, 'compact': compact, 'engine': engine}
+    texts = build_texts(detector, pipeline.named_steps['vectorizer'].vocabulary_, args.texts)
+
+    # Timing means nothing unless the results are identical
+    for sample in texts.values():
+        check_exact({'compact': compact, 'engine': engine}, pipeline, sample)
+    print(f"All {sum(map(len, texts.values())):,} texts score bit-for-bit identically\n")
+
+    print(f"{'texts':<8}{'model':<12}{'median us':>12}{'mean us':>12}{'speedup':>10}")
+    for name, sample in texts.items():
+        medians = {}
+        for mode, model in models.items():
+            latencies = time_per_message(model, sample, args.iterations)
+            medians[mode] = statistics.median(latencies)
+            print(f"{name:<8}{mode:<12}{medians[mode]:>12.1f}{statistics.mean(latencies):>12.1f}"
+                  f"{medians['pipeline'] / medians[mode]:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
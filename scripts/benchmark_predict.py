@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.spam_model import SpamDetector
+from models.prediction_cache import MemoryCache
+
+def legacy_predict(detector, text):
+    """The old two-pass prediction: predict() and predict_proba() separately"""
+    prediction = detector.model.predict([text])[0]
+    probabilities = detector.model.predict_proba([text])[0]
+    confidence = probabilities[1] if prediction == 1 else probabilities[0]
+    return prediction == 1, confidence
+
+def build_texts(detector):
+    """Build short and long sample texts from the detector's examples"""
+    examples = detector.spam_examples + detector.ham_examples
+    long_texts = [' '.join(examples[i:] + examples[:i]) * 5 for i in range(len(examples))]
+    return {
+        'short': examples,
+        'long': long_texts
+    }
+
+def time_per_message(predict, texts, iterations):
+    """Return per-message latencies in microseconds"""
+    latencies = []
+    for _ in range(iterations):
+        for text in texts:
+            start = time.perf_counter()
+            predict(text)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-message SpamDetector.predict latency')
+    parser.add_argument('--iterations', type=int, default=50, help='Passes over each sample set')
+    args = parser.parse_args()
+    
+    detector = SpamDetector()
+    detector.load_model()
+    
+    # Measure the model itself, not the prediction cache
+    detector.cache = MemoryCache(maxsize=0)
+    
+    modes = {
+        'two-pass': lambda text: legacy_predict(detector, text),
+        'single-pass': detector.predict
+    }
+    
+    print(f"{'texts':<8}{'mode':<14}{'median us':>12}{'mean us':>12}")
+    for name, texts in build_texts(detector).items():
+        # Make sure both modes agree before timing them
+        for text in texts:
+            old_spam, old_confidence = legacy_predict(detector, text)
+            new_spam, new_confidence = detector.predict(text)
+            assert bool(old_spam) == new_spam and abs(old_confidence - new_confidence) < 1e-12
+        
+        results = {}
+        for mode, predict in modes.items():
+            latencies = time_per_message(predict, texts, args.iterations)
+            results[mode] = statistics.median(latencies)
+            print(f"{name:<8}{mode:<14}{results[mode]:>12.1f}{statistics.mean(latencies):>12.1f}")
+        
+        print(f"{name:<8}{'speedup':<14}{results['two-pass'] / results['single-pass']:>11.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateTable
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import User, RequestHistory, GuestRequest
+
+TABLES = [User.__table__, RequestHistory.__table__, GuestRequest.__table__]
+
+# The query shapes used by /api/history, /api/admin/requests, /api/admin/stats
+# and the guest limit checkpoint
+QUERIES = {
+    'user history': (
+        "SELECT * FROM request_history WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 50"
+    ),
+    'admin requests': (
+        "SELECT request_history.*, users.username FROM request_history "
+        "JOIN users ON request_history.user_id = users.id "
+        "ORDER BY request_history.timestamp DESC LIMIT 10"
+    ),
+    'admin requests (spam, date range)': (
+        "SELECT request_history.*, users.username FROM request_history "
+        "JOIN users ON request_history.user_id = users.id "
+        "WHERE request_history.is_spam = 1 AND request_history.timestamp >= :date_from "
+        "AND request_history.timestamp < :date_to "
+        "ORDER BY request_history.timestamp DESC LIMIT 10"
+    ),
+    'spam count': (
+        "SELECT COUNT(*) FROM request_history WHERE is_spam = 1"
+    ),
+    'daily usage (7 days)': (
+        "SELECT date(timestamp), COUNT(*) FROM request_history "
+        "WHERE timestamp >= :week_ago GROUP BY date(timestamp) ORDER BY date(timestamp)"
+    ),
+    'guest lookup': (
+        "SELECT * FROM guest_requests WHERE ip_address = :ip"
+    )
+}
+
+def build_database(path, rows, users, guests):
+    """Create the schema without secondary indexes and fill it with synthetic rows"""
+    if os.path.exists(path):
+        os.remove(path)
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        for table in TABLES:
+            connection.execute(CreateTable(table))
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=OFF')
+    connection.execute('PRAGMA synchronous=OFF')
+
+    created = datetime(2025, 1, 1).strftime('%Y-%m-%d %H:%M:%S.%f')
+    connection.executemany(
+        'INSERT INTO users (id, username, email, password_hash, created_at, is_active, is_admin) VALUES (?, ?, ?, ?, ?, 1, 0)',
+        ((i, f"user{i}", f"user{i}@example.com", 'x', created) for i in range(1, users + 1))
+    )
+
+    # Spread requests over the last year, most recent rows last
+    end = datetime.utcnow()
+    start = end - timedelta(days=365)
+    step = (end - start) / rows
+    chunk = 100000
+    for offset in range(0, rows, chunk):
+        connection.executemany(
+            'INSERT INTO request_history (user_id, text, is_spam, confidence, timestamp) VALUES (?, ?, ?, ?, ?)',
+            (
+                (
+                    random.randint(1, users),
+                    f"synthetic message {i}",
+                    random.random() < 0.3,
+                    random.uniform(0.5, 1.0),
+                    (start + step * i).strftime('%Y-%m-%d %H:%M:%S.%f')
+                )
+                for i in range(offset, min(offset + chunk, rows))
+            )
+        )
+        connection.commit()
+        print(f"  {min(offset + chunk, rows):,} / {rows:,} rows", end='\r', flush=True)
+    print()
+
+    connection.executemany(
+        'INSERT INTO guest_requests (ip_address, request_count, last_reset) VALUES (?, ?, ?)',
+        ((f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 1, created) for i in range(guests))
+    )
+    connection.commit()
+    connection.execute('ANALYZE')
+    return connection
+
+def create_indexes(path):
+    """Create the indexes declared on the models"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        for table in TABLES:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        connection.exec_driver_sql('ANALYZE')
+    engine.dispose()
+
+def run_queries(connection, params, repeat):
+    """Return {query: (plan, median_ms)}"""
+    results = {}
+    for name, sql in QUERIES.items():
+        plan = [row[-1] for row in connection.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connection.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = (plan, statistics.median(timings))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Query plans and timings for request_history with and without indexes')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000], help='Row counts to benchmark')
+    parser.add_argument('--users', type=int, default=10000, help='Number of synthetic users')
+    parser.add_argument('--guests', type=int, default=100000, help='Number of guest_requests rows')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+    parser.add_argument('--path', default='benchmark_queries.db', help='Scratch SQLite file (overwritten)')
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    params = {
+        'user_id': 1,
+        'ip': '10.0.1.1',
+        'date_from': (now - timedelta(days=30)).strftime('%Y-%m-%d'),
+        'date_to': (now - timedelta(days=29)).strftime('%Y-%m-%d'),
+        'week_ago': (now - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    for rows in args.rows:
+        print(f"Building {rows:,} rows in {args.path}")
+        connection = build_database(args.path, rows, args.users, args.guests)
+        before = run_queries(connection, params, args.repeat)
+        connection.close()
+
+        start = time.perf_counter()
+        create_indexes(args.path)
+        print(f"Indexes created in {time.perf_counter() - start:.1f}s")
+
+        connection = sqlite3.connect(args.path)
+        after = run_queries(connection, params, args.repeat)
+        connection.close()
+
+        print(f"\n=== {rows:,} rows ===")
+        for name in QUERIES:
+            plan_before, ms_before = before[name]
+            plan_after, ms_after = after[name]
+            print(f"\n{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms")
+            print(f"  before: {'; '.join(plan_before)}")
+            print(f"  after:  {'; '.join(plan_after)}")
+        print()
+
+    os.remove(args.path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.spam_model import SpamDetector
+
+def export_compact_model(path=None):
+    """Convert the live pickled model into the memory-mappable compact format"""
+    detector = SpamDetector()
+    detector.model_format = 'pickle'
+    detector.ensure_loaded()
+    path = path or detector.compact_path
+    detector.export_compact(path)
+    print(f"Written to {path}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        print("Usage: python export_compact_model.py [output_path]")
+        sys.exit(1)
+    
+    export_compact_model(sys.argv[1] if len(sys.argv) == 2 else None)
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+from itertools import groupby
+from werkzeug.datastructures import MultiDict
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, build_admin_requests_query
+from database.models import RequestHistory
+from database.export import EXPORT_FORMATS, iter_export_rows, write_export
+
+STATE_FILE = '_export_state.json'
+
+def load_state(directory):
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return {'last_id': 0}
+    with open(path) as f:
+        return json.load(f)
+
+def save_state(directory, state):
+    path = os.path.join(directory, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+def export_history(directory, fmt='parquet', full=False, date_from=None, date_to=None):
+    """
+    Export request history into one directory per day
+
+    Files are laid out as <directory>/date=YYYY-MM-DD/part-<first id>.<ext>,
+    which Spark, DuckDB and pyarrow.dataset read as a date-partitioned
+    dataset. The highest exported id is kept in _export_state.json, so the
+    next run only writes requests that are new since then, as extra part
+    files in the affected days. A run restricted to a date range is a
+    one-off and leaves that state alone; give it its own directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    incremental = not (date_from or date_to)
+    state = load_state(directory) if incremental and not full else {'last_id': 0}
+    if full:
+        # Drop earlier part files so the full export doesn't duplicate them
+        for path in glob.glob(os.path.join(directory, 'date=*', 'part-*')):
+            os.remove(path)
+    start_id = state['last_id'] + 1
+    extension = EXPORT_FORMATS[fmt][1]
+
+    args = MultiDict({'date_from': date_from or '', 'date_to': date_to or ''})
+    with app.app_context():
+        query, _ = build_admin_requests_query(args)
+        query = query.filter(RequestHistory.id >= start_id)
+        rows = iter_export_rows(query, app.config['EXPORT_CHUNK_SIZE'], newest_first=False)
+
+        last_id = state['last_id']
+        exported = 0
+        start = time.perf_counter()
+        # Rows arrive in time order, so each day is one contiguous run
+        for day, day_rows in groupby(rows, key=lambda row: row[5].date()):
+            partition = os.path.join(directory, f"date={day.isoformat()}")
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, f"part-{start_id:012d}.{extension}")
+
+            count = 0
+            def tracked(rows):
+                nonlocal count, last_id
+                for row in rows:
+                    count += 1
+                    last_id = max(last_id, row[0])
+                    yield row
+
+            size = write_export(tracked(day_rows), path, fmt, app.config['EXPORT_ROW_GROUP_SIZE'])
+            exported += count
+            print(f"  {path}: {count:,} rows, {size / 1e6:.1f} MB")
+
+    if incremental:
+        save_state(directory, {'last_id': last_id, 'format': fmt})
+    print(f"Exported {exported:,} requests in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export request history as date-partitioned files')
+    parser.add_argument('directory', help='Output directory')
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='parquet', help='File format')
+    parser.add_argument('--full', action='store_true', help='Export everything again instead of only new requests')
+    parser.add_argument('--date-from', help='Only export from this date (YYYY-MM-DD)')
+    parser.add_argument('--date-to', help='Only export up to this date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    export_history(args.directory, args.format, args.full, args.date_from, args.date_to)
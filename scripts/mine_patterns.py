@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+import argparse
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, pattern_miner
+
+def mine_patterns(full=False, show=10):
+    """Mine new request history for spam patterns and print the top ones"""
+    with app.app_context():
+        start = time.perf_counter()
+        result = pattern_miner.refresh(full=full)
+        elapsed = time.perf_counter() - start
+        
+        if not result['applied']:
+            print("Another mining run got there first; nothing applied")
+            return
+        
+        print(f"Mined {result['mined']:,} requests in {elapsed:.2f}s "
+              f"({result['spam_total']:,} spam / {result['ham_total']:,} ham in total)")
+        for rank, pattern in enumerate(pattern_miner.top_patterns(show), 1):
+            print(f"{rank:3d}. {pattern.pattern:<30} lift {pattern.lift:6.1f}  "
+                  f"spam {pattern.spam_docs:,}  ham {pattern.ham_docs:,}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mine request history for spam patterns')
+    parser.add_argument('--full', action='store_true', help='Discard the counts and mine the whole history again')
+    parser.add_argument('--show', type=int, default=10, help='Number of top patterns to print')
+    args = parser.parse_args()
+    
+    mine_patterns(args.full, args.show)
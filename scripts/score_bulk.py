@@ -0,0 +1,232 @@
+import os
+import io
+import sys
+import csv
+import gzip
+import json
+import time
+import email
+import contextlib
+import argparse
+from email import policy
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the parent directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.spam_model import SpamDetector
+
+FORMATS = ('mbox', 'csv', 'jsonl')
+
+# Set in each pool worker by init_worker
+_detector = None
+
+def detect_format(path):
+    """Guess the input format from the file name"""
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension in ('.mbox', '.mbx', ''):
+        return 'mbox'
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension in ('.csv', '.tsv'):
+        return 'csv'
+    raise ValueError(f"Can't tell the format of {path}; pass --format")
+
+def open_input(path):
+    """Open a file (gzipped or not) or stdin for binary reading"""
+    if path == '-':
+        return sys.stdin.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def message_text(raw):
+    """Subject and plain-text body of a raw RFC 822 message"""
+    message = email.message_from_bytes(raw, policy=policy.default)
+    parts = [str(message.get('subject', ''))]
+    body = message.get_body(preferencelist=('plain', 'html'))
+    if body is not None:
+        try:
+            parts.append(body.get_content())
+        except (LookupError, UnicodeDecodeError):
+            parts.append(body.get_payload(decode=True).decode('utf-8', 'replace'))
+    return '\n'.join(part for part in parts if part), message.get('message-id')
+
+def read_mbox(stream):
+    """
+    Yield (id, text) for each message of an mbox stream
+
+    Messages are split on 'From ' lines as they are read, so the mailbox is
+    never loaded or indexed as a whole.
+    """
+    lines = []
+    index = 0
+
+    def emit():
+        text, message_id = message_text(b''.join(lines))
+        return message_id or str(index), text
+
+    for line in stream:
+        if line.startswith(b'From ') and lines:
+            yield emit()
+            index += 1
+            lines = []
+        elif line.startswith(b'From ') and not lines:
+            continue
+        else:
+            # Undo mboxrd quoting of body lines that start with 'From '
+            if line.startswith(b'>') and line.lstrip(b'>').startswith(b'From '):
+                line = line[1:]
+            lines.append(line)
+    if lines:
+        yield emit()
+
+def read_csv(stream, text_column, id_column, delimiter=','):
+    """Yield (id, text) for each CSV or TSV row"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''), delimiter=delimiter)
+    for index, row in enumerate(reader):
+        yield (row[id_column] if id_column else str(index)), row[text_column] or ''
+
+def read_jsonl(stream, text_field, id_field):
+    """Yield (id, text) for each JSON line"""
+    for index, line in enumerate(stream):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield str(record.get(id_field, index)), record.get(text_field) or ''
+
+def read_records(path, fmt, args):
+    stream = open_input(path)
+    if fmt == 'mbox':
+        return read_mbox(stream)
+    if fmt == 'csv':
+        name = path[:-3] if path.endswith('.gz') else path
+        delimiter = '\t' if name.lower().endswith('.tsv') else ','
+        return read_csv(stream, args.text_column, args.id_column, delimiter)
+    return read_jsonl(stream, args.text_column, args.id_column or 'id')
+
+def chunked(records, size):
+    """Group records into lists of at most size"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def init_worker(model_format, registry_path):
+    """Load the model once in each pool process"""
+    global _detector
+    _detector = SpamDetector()
+    _detector.model_format = model_format
+    if registry_path:
+        _detector.registry_path = registry_path
+    # Archives rarely repeat messages; skip the cache, including its keys
+    _detector.cache = None
+    # Keep load messages out of results written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        _detector.ensure_loaded()
+
+def score_chunk(texts):
+    """Score one chunk with a single vectorized call"""
+    return _detector.predict_batch(texts, return_version=True)
+
+def score_chunks(chunks, workers, model_format, registry_path):
+    """
+    Yield (chunk, results, model_version) in input order
+
+    With more than one worker, chunks are scored in a process pool with at
+    most two chunks per worker in flight, so memory stays bounded however
+    large the input is.
+    """
+    if workers <= 1:
+        init_worker(model_format, registry_path)
+        for chunk in chunks:
+            results, model_version = score_chunk([text for _, text in chunk])
+            yield chunk, results, model_version
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_format, registry_path)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(score_chunk, [text for _, text in chunk])))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield (chunk,) + future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield (chunk,) + future.result()
+
+class ResultWriter:
+    """Write results as JSON lines or CSV"""
+
+    def __init__(self, stream, fmt, include_text=False):
+        self.stream = stream
+        self.fmt = fmt
+        self.include_text = include_text
+        self.fields = ['id', 'is_spam', 'confidence', 'model_version'] + (['text'] if include_text else [])
+        if fmt == 'csv':
+            self.writer = csv.writer(stream)
+            self.writer.writerow(self.fields)
+
+    def write(self, chunk, results, model_version):
+        for (record_id, text), (is_spam, confidence) in zip(chunk, results):
+            values = [record_id, is_spam, confidence, model_version] + ([text] if self.include_text else [])
+            if self.fmt == 'csv':
+                self.writer.writerow(values)
+            else:
+                self.stream.write(json.dumps(dict(zip(self.fields, values))) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Score mbox, CSV or JSONL archives with the spam model')
+    parser.add_argument('inputs', nargs='+', help="Input files ('-' for stdin); .gz files are decompressed")
+    parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+    parser.add_argument('--text-column', default='text', help='CSV column / JSON field holding the message text')
+    parser.add_argument('--id-column', help='CSV column / JSON field holding a message ID (default: row number)')
+    parser.add_argument('-o', '--output', default='-', help="Output file, '-' for stdout")
+    parser.add_argument('--output-format', choices=('jsonl', 'csv'), help='Output format (default: from the output extension, else jsonl)')
+    parser.add_argument('--include-text', action='store_true', help='Copy the message text into the output')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Messages scored per vectorized call')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Scoring processes (1 scores in this process)')
+    parser.add_argument('--model-format', choices=('compact', 'engine', 'pickle'), default=os.environ.get('MODEL_FORMAT', 'pickle'))
+    parser.add_argument('--registry', default=os.environ.get('MODEL_REGISTRY_PATH'), help='Model registry directory')
+    parser.add_argument('--progress', type=float, default=5.0, help='Seconds between throughput reports on stderr, 0 for none')
+    args = parser.parse_args()
+
+    output_format = args.output_format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    writer = ResultWriter(output, output_format, args.include_text)
+
+    def records():
+        for path in args.inputs:
+            yield from read_records(path, args.format or detect_format(path), args)
+
+    start = time.perf_counter()
+    next_report = start + args.progress
+    scored = 0
+    spam = 0
+    try:
+        chunks = chunked(records(), args.chunk_size)
+        for chunk, results, model_version in score_chunks(chunks, args.workers, args.model_format, args.registry):
+            writer.write(chunk, results, model_version)
+            scored += len(results)
+            spam += sum(1 for is_spam, _ in results if is_spam)
+
+            now = time.perf_counter()
+            if args.progress and now >= next_report:
+                print(f"{scored:,} messages, {scored / (now - start):,.0f} msg/s", file=sys.stderr)
+                next_report = now + args.progress
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {scored:,} messages ({spam:,} spam) in {elapsed:.1f}s: "
+          f"{scored / elapsed if elapsed else 0:,.0f} msg/s with {args.workers} worker(s)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -16,9 +16,11 @@ document.addEventListener('DOMContentLoaded', async function() {
 
 // Global variables
 let currentPage = 1;
-let totalPages = 1;
 let requestsPerPage = 10;
 let currentFilters = {};
+// pageCursors[n - 1] is the cursor that loads page n; page 1 needs none
+let pageCursors = [null];
+let hasNextPage = false;
 
 async function loadRequests(page = 1) {
     try {
@@ -26,9 +28,19 @@ async function loadRequests(page = 1) {
         const requestsTableBody = document.getElementById('requests-table-body');
         requestsTableBody.innerHTML = '<tr><td colspan="6" class="text-center">Loading...</td></tr>';
         
+        // Start over from the first page when the filters change
+        if (page === 1) {
+            pageCursors = [null];
+        }
+        
         // Build URL with filters
         const requestsUrl = await getApiUrl('admin', 'requests');
-        let url = `${requestsUrl}?page=${page}&per_page=${requestsPerPage}`;
+        let url = `${requestsUrl}?per_page=${requestsPerPage}`;
+        
+        const cursor = pageCursors[page - 1];
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
         
         // Add filters to URL
         for (const [key, value] of Object.entries(currentFilters)) {
@@ -49,20 +61,21 @@ async function loadRequests(page = 1) {
         
         const data = await response.json();
         
-        // Update pagination info
-        currentPage = data.page;
-        totalPages = data.pages;
+        // Update pagination info and remember the cursor for the next page
+        currentPage = page;
+        hasNextPage = Boolean(data.next_cursor);
+        pageCursors[page] = data.next_cursor;
         
         // Update pagination display
-        document.getElementById('showing-start').textContent = data.total > 0 
-            ? (currentPage - 1) * requestsPerPage + 1 
-            : 0;
-        document.getElementById('showing-end').textContent = Math.min(currentPage * requestsPerPage, data.total);
-        document.getElementById('total-count').textContent = data.total;
+        const showingStart = data.requests.length > 0 ? (currentPage - 1) * requestsPerPage + 1 : 0;
+        document.getElementById('showing-start').textContent = showingStart;
+        document.getElementById('showing-end').textContent = (currentPage - 1) * requestsPerPage + data.requests.length;
+        // The total may come from a short-lived cache, so it can lag slightly
+        document.getElementById('total-count').textContent = data.total ?? '?';
         
         // Enable/disable pagination buttons
         document.getElementById('prev-page').disabled = currentPage <= 1;
-        document.getElementById('next-page').disabled = currentPage >= totalPages;
+        document.getElementById('next-page').disabled = !hasNextPage;
         
         // Update requests table
         requestsTableBody.innerHTML = '';
@@ -172,9 +185,13 @@ async function exportRequestsCSV() {
     try {
         const exportUrl = await getApiUrl('admin', 'export_requests');
         
+        // Export with the filters currently applied to the table
+        const params = new URLSearchParams(currentFilters);
+        params.set('token', localStorage.getItem('access_token'));
+        
         // Create a temporary link and click it to download the file
         const link = document.createElement('a');
-        link.href = exportUrl + '?token=' + localStorage.getItem('access_token');
+        link.href = exportUrl + '?' + params.toString();
         link.download = 'requests.csv';
         link.click();
         
@@ -186,7 +203,8 @@ async function exportRequestsCSV() {
 
 function changePage(direction) {
     const newPage = currentPage + direction;
-    if (newPage >= 1 && newPage <= totalPages) {
-        loadRequests(newPage);
+    if (newPage < 1 || (direction > 0 && !hasNextPage)) {
+        return;
     }
+    loadRequests(newPage);
 } 
\ No newline at end of file
@@ -3,7 +3,7 @@ document.addEventListener('DOMContentLoaded', async function() {
     await loadStatistics();
     
     // Set up refresh button
-    document.getElementById('refresh-patterns-btn').addEventListener('click', loadStatistics);
+    document.getElementById('refresh-patterns-btn').addEventListener('click', refreshPatterns);
     
     // Set up refresh interval (every 5 minutes)
     setInterval(loadStatistics, 300000);
@@ -38,6 +38,34 @@ async function loadStatistics() {
     }
 }
 
+async function refreshPatterns() {
+    const button = document.getElementById('refresh-patterns-btn');
+    button.disabled = true;
+    
+    try {
+        const refreshPatternsUrl = await getApiUrl('admin', 'refresh_patterns');
+        const response = await fetch(refreshPatternsUrl, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+            }
+        });
+        
+        if (!response.ok) {
+            throw new Error('Failed to refresh patterns');
+        }
+        
+        const data = await response.json();
+        updateTopPatternsTable(data.top_patterns);
+        
+    } catch (error) {
+        console.error('Pattern refresh error:', error);
+        showAdminAlert('Failed to refresh spam patterns', 'danger');
+    } finally {
+        button.disabled = false;
+    }
+}
+
 function createSpamDistributionChart(data) {
     const ctx = document.getElementById('spam-distribution-chart').getContext('2d');
     
@@ -186,7 +214,7 @@ function updateTopPatternsTable(patterns) {
     patternsTableBody.innerHTML = '';
     
     if (patterns.length === 0) {
-        patternsTableBody.innerHTML = '<tr><td colspan="3" class="text-center">No patterns found</td></tr>';
+        patternsTableBody.innerHTML = '<tr><td colspan="4" class="text-center">No patterns found</td></tr>';
         return;
     }
     
@@ -196,6 +224,7 @@ function updateTopPatternsTable(patterns) {
         row.innerHTML = `
             <td>${pattern.pattern}</td>
             <td>${pattern.occurrences}</td>
+            <td>${pattern.lift.toFixed(1)}x</td>
             <td>${(pattern.avg_confidence * 100).toFixed(1)}%</td>
         `;
         
@@ -26,7 +26,9 @@ async function fetchApiUrls() {
             },
             api: {
                 check_spam: '/api/check-spam',
+                check_spam_batch: '/api/check-spam/batch',
                 history: '/api/history',
+                feedback: '/api/feedback',
                 example_spam: '/api/example/spam',
                 example_ham: '/api/example/ham',
             },
@@ -14,8 +14,41 @@ document.addEventListener('DOMContentLoaded', function() {
     if (refreshBtn) {
         refreshBtn.addEventListener('click', loadHistory);
     }
+    
+    // Load more button event listener
+    const loadMoreBtn = document.getElementById('load-more-history');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', loadMoreHistory);
+    }
 });
 
+// Cursor for the next page of history, null when there are no more pages
+let nextCursor = null;
+const HISTORY_PAGE_SIZE = 50;
+
+// Fetch one page of history starting after the given cursor
+async function fetchHistoryPage(cursor) {
+    const token = localStorage.getItem('access_token');
+    const historyUrl = await getApiUrl('api', 'history');
+    
+    let url = `${historyUrl}?limit=${HISTORY_PAGE_SIZE}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    
+    const response = await fetch(url, {
+        headers: {
+            'Authorization': `Bearer ${token}`
+        }
+    });
+    
+    if (!response.ok) {
+        throw new Error('Failed to fetch history');
+    }
+    
+    return response.json();
+}
+
 async function loadHistory() {
     const token = localStorage.getItem('access_token');
     const loadingElement = document.getElementById('history-loading');
@@ -28,21 +61,9 @@ async function loadHistory() {
         // Show loading state
         showLoadingState();
         
-        // Get history URL
-        const historyUrl = await getApiUrl('api', 'history');
-        
-        // Fetch history
-        const response = await fetch(historyUrl, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        if (!response.ok) {
-            throw new Error('Failed to fetch history');
-        }
-        
-        const data = await response.json();
+        // Fetch the first page of history
+        const data = await fetchHistoryPage(null);
+        nextCursor = data.next_cursor;
         
         // Handle empty history
         if (!data.history || data.history.length === 0) {
@@ -53,6 +74,7 @@ async function loadHistory() {
         // Show table and populate with data
         showTableState();
         populateTable(data.history);
+        updateLoadMore();
         
     } catch (error) {
         console.error('History error:', error);
@@ -66,6 +88,32 @@ async function loadHistory() {
     }
 }
 
+async function loadMoreHistory() {
+    const loadMoreBtn = document.getElementById('load-more-history');
+    if (!nextCursor) return;
+    
+    try {
+        if (loadMoreBtn) loadMoreBtn.disabled = true;
+        
+        // Fetch the page after the last row shown and append it
+        const data = await fetchHistoryPage(nextCursor);
+        nextCursor = data.next_cursor;
+        appendRows(data.history);
+        
+    } catch (error) {
+        console.error('History error:', error);
+        showAlert('Failed to load more history. Please try again later.', 'danger');
+    } finally {
+        if (loadMoreBtn) loadMoreBtn.disabled = false;
+        updateLoadMore();
+    }
+}
+
+function updateLoadMore() {
+    const moreElement = document.getElementById('history-more');
+    if (moreElement) moreElement.style.display = nextCursor ? 'block' : 'none';
+}
+
 // Helper functions to manage UI states
 function showLoadingState() {
     const loadingElement = document.getElementById('history-loading');
@@ -77,6 +125,9 @@ function showLoadingState() {
     if (emptyElement) emptyElement.style.display = 'none';
     if (tableContainer) tableContainer.style.display = 'none';
     if (refreshBtn) refreshBtn.disabled = true;
+    
+    nextCursor = null;
+    updateLoadMore();
 }
 
 function showEmptyState() {
@@ -107,6 +158,13 @@ function populateTable(history) {
     tableBody.innerHTML = '';
     
     // Add new rows
+    appendRows(history);
+}
+
+function appendRows(history) {
+    const tableBody = document.getElementById('history-table-body');
+    if (!tableBody || !history) return;
+    
     history.forEach(item => {
         const row = createHistoryRow(item);
         tableBody.appendChild(row);
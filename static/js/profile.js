@@ -75,11 +75,11 @@ async function loadUsageStats() {
     const token = localStorage.getItem('access_token');
     
     try {
-        // Get history URL
-        const historyUrl = await getApiUrl('api', 'history');
+        // Get history stats URL
+        const statsUrl = await getApiUrl('api', 'history_stats');
         
-        // Fetch history data
-        const response = await fetch(historyUrl, {
+        // Fetch totals over the whole history
+        const response = await fetch(statsUrl, {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -91,10 +91,9 @@ async function loadUsageStats() {
         
         const data = await response.json();
         
-        // Calculate statistics
-        const totalChecks = data.history.length;
-        const spamChecks = data.history.filter(item => item.is_spam).length;
-        const hamChecks = totalChecks - spamChecks;
+        const totalChecks = data.total;
+        const spamChecks = data.spam;
+        const hamChecks = data.ham;
         
         // Update statistics display
         document.getElementById('stats-total').textContent = totalChecks;